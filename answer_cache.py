@@ -0,0 +1,152 @@
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_question(question):
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.strip(" ?!.")
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries=512,
+        ttl_seconds=3600,
+        similarity_threshold=0.95,
+        version_getter=None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version_getter = version_getter
+        self.version = version_getter() if version_getter else None
+
+        self.entries = OrderedDict()
+        self.matrix = None
+        self.matrix_keys = []
+        self.lock = threading.Lock()
+        self.counters = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def _check_version(self):
+        if not self.version_getter:
+            return
+
+        version = self.version_getter()
+        if version != self.version:
+            self.version = version
+            if self.entries:
+                self.counters["invalidations"] += 1
+            self.entries.clear()
+            self.matrix = None
+
+    def _expired(self, entry):
+        return self.ttl_seconds and time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _drop(self, key):
+        self.entries.pop(key, None)
+        self.matrix = None
+
+    def get_exact(self, question):
+        key = normalize_question(question)
+
+        with self.lock:
+            self._check_version()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self.counters["expirations"] += 1
+                self._drop(key)
+                return None
+
+            self.entries.move_to_end(key)
+            self.counters["exact_hits"] += 1
+            return copy.deepcopy(entry["value"])
+
+    def get_semantic(self, embedding):
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        query /= norm
+
+        with self.lock:
+            self._check_version()
+            if not self.entries:
+                self.counters["misses"] += 1
+                return None
+
+            if self.matrix is None:
+                self.matrix_keys = list(self.entries)
+                self.matrix = np.stack(
+                    [self.entries[key]["embedding"] for key in self.matrix_keys]
+                )
+
+            scores = self.matrix @ query
+            best = int(np.argmax(scores))
+            key = self.matrix_keys[best]
+            entry = self.entries.get(key)
+
+            if entry is None or scores[best] < self.similarity_threshold:
+                self.counters["misses"] += 1
+                return None
+            if self._expired(entry):
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                self._drop(key)
+                return None
+
+            self.entries.move_to_end(key)
+            self.counters["semantic_hits"] += 1
+            return copy.deepcopy(entry["value"])
+
+    def put(self, question, embedding, value):
+        key = normalize_question(question)
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        with self.lock:
+            self._check_version()
+            self.entries[key] = {
+                "embedding": vector,
+                "value": copy.deepcopy(value),
+                "created_at": time.time(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+            self.matrix = None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.matrix = None
+
+    def stats(self):
+        with self.lock:
+            lookups = (
+                self.counters["exact_hits"]
+                + self.counters["semantic_hits"]
+                + self.counters["misses"]
+            )
+            hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+            return {
+                **self.counters,
+                "entries": len(self.entries),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+
+
+def records_name(generation):
+    return f"records.{generation}.bin" if generation else "records.bin"
+
+
+class PageArchive:
+    def __init__(self, root="data/archive", compression_level=6):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.compression_level = compression_level
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite"), check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self.conn.commit()
+
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        self.generation = row[0] if row else 0
+        self.records_path = os.path.join(root, records_name(self.generation))
+        self.records = open(self.records_path, "ab+")
+
+    def _remove_stale_records(self):
+        current = records_name(self.generation)
+        for name in os.listdir(self.root):
+            if re.fullmatch(r"records(\.\d+)?\.bin", name) and name != current:
+                os.remove(os.path.join(self.root, name))
+
+    def put_page(self, url, html, etag="", last_modified=""):
+        raw = html.encode("utf-8")
+        compressed = zlib.compress(raw, self.compression_level)
+
+        with self.lock:
+            self.records.seek(0, os.SEEK_END)
+            offset = self.records.tell()
+            self.records.write(compressed)
+            self.records.flush()
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    offset,
+                    len(compressed),
+                    len(raw),
+                    etag,
+                    last_modified,
+                    time.time(),
+                ),
+            )
+            self.conn.commit()
+
+    def _read(self, offset, length):
+        self.records.seek(offset)
+        return zlib.decompress(self.records.read(length)).decode("utf-8")
+
+    def get_page(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT offset, length, etag, last_modified FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            offset, length, etag, last_modified = row
+            return {
+                "url": url,
+                "html": self._read(offset, length),
+                "etag": etag or "",
+                "last_modified": last_modified or "",
+            }
+
+    def urls(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT url FROM pages ORDER BY offset").fetchall()
+        return [row[0] for row in rows]
+
+    def iter_pages(self, urls=None):
+        for url in urls or self.urls():
+            page = self.get_page(url)
+            if page:
+                yield page
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def compact(self):
+        with self.lock:
+            self._remove_stale_records()
+            rows = self.conn.execute(
+                "SELECT url, offset, length FROM pages ORDER BY offset"
+            ).fetchall()
+            before = os.path.getsize(self.records_path)
+            if sum(length for _, _, length in rows) == before:
+                return 0
+
+            generation = self.generation + 1
+            new_path = os.path.join(self.root, records_name(generation))
+            new_offsets = []
+            with open(new_path, "wb") as out:
+                for url, offset, length in rows:
+                    self.records.seek(offset)
+                    new_offsets.append((out.tell(), url))
+                    out.write(self.records.read(length))
+                out.flush()
+                os.fsync(out.fileno())
+
+            self.conn.executemany(
+                "UPDATE pages SET offset = ? WHERE url = ?", new_offsets
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (generation,)
+            )
+            self.conn.commit()
+
+            self.records.close()
+            os.remove(self.records_path)
+            self.generation = generation
+            self.records_path = new_path
+            self.records = open(self.records_path, "ab+")
+            return before - os.path.getsize(self.records_path)
+
+    def close(self):
+        with self.lock:
+            self.records.close()
+            self.conn.close()
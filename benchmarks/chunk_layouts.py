@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import use_stub_models, build_engine, synthetic_results
+from image_processor import StubCaptioner, configure_captioning
+from llama_index.core.schema import QueryBundle
+from retriever import RecencyRetriever
+from vector_store import LAYOUTS
+
+VOCABULARY = [f"term{i}" for i in range(5000)]
+
+
+def tail_queries(results, count, query_words, seed=7):
+    rng = random.Random(seed)
+    chapters = [chapter for result in results for chapter in result["chapters"]]
+    queries = []
+
+    for _ in range(count):
+        chapter = rng.choice(chapters)
+        words = chapter["content"].split()
+        start = rng.randrange(0, max(1, len(words) - query_words))
+        queries.append((" ".join(words[start : start + query_words]), chapter["id"]))
+
+    return queries
+
+
+def percentiles(seconds):
+    millis = np.array(seconds or [0.0]) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p95_ms": round(float(np.percentile(millis, 95)), 3),
+    }
+
+
+def bench_layout(args, root, layout, queries):
+    db_path = os.path.join(root, layout)
+    start = time.perf_counter()
+    engine = build_engine(
+        db_path,
+        args.chapters,
+        args.backend,
+        layout=layout,
+        words=args.words,
+        vocabulary=VOCABULARY,
+    )
+    build_seconds = time.perf_counter() - start
+
+    retriever = RecencyRetriever(
+        engine.index,
+        candidate_k=engine.retriever.candidate_k,
+        top_k=max(args.k),
+        score_cutoff=0.0,
+        recency_weight=0.0,
+    )
+    hits = {k: 0 for k in args.k}
+    retrieve_latencies = []
+    search_latencies = []
+
+    for question, chapter_id in queries:
+        start = time.perf_counter()
+        nodes = retriever.retrieve(QueryBundle(question))
+        retrieve_latencies.append(time.perf_counter() - start)
+
+        parents = [node.node.ref_doc_id for node in nodes]
+        for k in args.k:
+            hits[k] += chapter_id in parents[:k]
+
+        start = time.perf_counter()
+        engine.search(question)
+        search_latencies.append(time.perf_counter() - start)
+
+    store = engine.index.vector_store
+    chunks = store.count() if hasattr(store, "count") else store._collection.count()
+    return {
+        "layout": layout,
+        "chunks": chunks,
+        "build_seconds": round(build_seconds, 3),
+        **{f"recall@{k}": round(hits[k] / len(queries), 3) for k in args.k},
+        "retrieve": percentiles(retrieve_latencies),
+        "search": percentiles(search_latencies),
+    }
+
+
+def run(args):
+    use_stub_models(
+        llm_latency=0.0, embed_latency=args.embed_latency, max_words=args.max_words
+    )
+    queries = tail_queries(
+        synthetic_results(args.chapters, words=args.words, vocabulary=VOCABULARY),
+        args.queries,
+        args.query_words,
+    )
+
+    report = []
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        configure_captioning(StubCaptioner(), cache_path=None)
+        for layout in args.layouts:
+            row = bench_layout(args, root, layout, queries)
+            report.append(row)
+            recall = "  ".join(f"recall@{k} {row[f'recall@{k}']:.3f}" for k in args.k)
+            print(
+                f"{layout:<12} {row['chunks']:>7} chunks  {recall}  "
+                f"retrieve p50 {row['retrieve']['p50_ms']:.1f}ms  "
+                f"search p50 {row['search']['p50_ms']:.1f}ms "
+                f"p95 {row['search']['p95_ms']:.1f}ms"
+            )
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare recall and latency of whole-chapter and "
+        "hierarchical child-chunk layouts"
+    )
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=LAYOUTS)
+    parser.add_argument("--backend", default="numpy", choices=["chroma", "numpy"])
+    parser.add_argument("--chapters", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=700, help="Words per chapter")
+    parser.add_argument(
+        "--max-words",
+        type=int,
+        default=380,
+        help="Words the stub embedding reads, like bge's 512-token window",
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = run(args)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
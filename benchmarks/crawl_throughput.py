@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import AsyncFetcher
+from scrapper import iter_scrape
+from fixture_server import FixtureServer
+
+
+def run_crawl(urls, images_dir, concurrency, per_host_rate):
+    def fetcher_factory():
+        return AsyncFetcher(
+            per_host_concurrency=concurrency,
+            per_host_rate=per_host_rate,
+            backoff=0.05,
+        )
+
+    start = time.perf_counter()
+    pages = chapters = images = errors = 0
+    for result in iter_scrape(
+        urls,
+        "#content > article ",
+        images_dir,
+        max_workers=concurrency,
+        fetcher_factory=fetcher_factory,
+    ):
+        pages += 1
+        if result["status"] != "success":
+            errors += 1
+            continue
+        chapters += len(result["chapters"])
+        images += sum(len(chapter["images"]) for chapter in result["chapters"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "pages": pages,
+        "chapters": chapters,
+        "images": images,
+        "errors": errors,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed if elapsed else 0.0,
+        "images_per_sec": images / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure crawl throughput offline")
+    parser.add_argument("--issues", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10, 20])
+    parser.add_argument("--rate", type=float, default=0.0)
+    parser.add_argument("--pages-dir")
+    args = parser.parse_args()
+
+    with FixtureServer(
+        latency=args.latency, fail_rate=args.fail_rate, pages_dir=args.pages_dir
+    ) as server:
+        urls = server.issue_urls(args.issues)
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory() as images_dir:
+                stats = run_crawl(urls, images_dir, concurrency, args.rate)
+            print(
+                f"concurrency={concurrency:>3}: {stats['pages']} pages, "
+                f"{stats['images']} images in {stats['seconds']:.2f}s "
+                f"({stats['pages_per_sec']:.1f} pages/s, "
+                f"{stats['images_per_sec']:.1f} images/s, {stats['errors']} errors)"
+            )
+        print(f"Server counters: {server.counters}")
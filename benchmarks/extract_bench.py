@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import datetime
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import chapter_id, extract_article
+from fixture_server import make_page
+
+SELECTOR = "#content > article "
+
+
+def legacy_parse_article(html, url, selector):
+    soup = BeautifulSoup(html, "html.parser")
+    article_container = soup.select_one(selector)
+
+    if not article_container:
+        return {
+            "url": url,
+            "status": "no_matches",
+            "chapters": [],
+        }
+
+    article_id = url.split("/")[-2]
+
+    published_date_element = article_container.select_one(
+        "div.mt-1.text-slate-600.text-base.text-sm"
+    )
+    published_date = (
+        published_date_element.get_text(strip=True) if published_date_element else ""
+    )
+    try:
+        published_date_iso = datetime.datetime.strptime(
+            published_date.strip(), "%b %d, %Y"
+        ).strftime("%Y-%m-%d")
+    except ValueError:
+        published_date_iso = ""
+
+    news_tag = article_container.find(["h2", "h1"], id="news")
+
+    if news_tag:
+        post_news_elements = []
+        current = news_tag.next_sibling
+        while current:
+            post_news_elements.append(str(current))
+            current = current.next_sibling
+        html_for_splitting = "".join(post_news_elements)
+    else:
+        html_for_splitting = str(article_container)
+
+    blocks = re.split(r"<hr\s*/?>", html_for_splitting, flags=re.IGNORECASE)
+
+    chapters = []
+    for i, block_html in enumerate(blocks):
+        block_soup = BeautifulSoup(block_html, "html.parser")
+
+        header_tag = block_soup.find(["h1", "h2", "strong"])
+        title = header_tag.get_text(strip=True) if header_tag else f"Section {i+1}"
+
+        if "deeplearning.ai" in title.lower() or "news" in title.lower():
+            continue
+
+        paragraphs = block_soup.find_all("p")
+        section_text = " ".join(
+            [p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)]
+        )
+
+        image_srcs = [
+            img.get("src") for img in block_soup.find_all("img") if img.get("src")
+        ]
+
+        if not section_text and not image_srcs:
+            continue
+
+        chapters.append(
+            {
+                "id": chapter_id(article_id, i),
+                "title": title,
+                "content": section_text,
+                "image_srcs": image_srcs,
+                "article_id": article_id,
+                "url": url,
+                "published_date": published_date_iso,
+            }
+        )
+
+    return {
+        "url": url,
+        "status": "success",
+        "article_id": article_id,
+        "published_date": published_date_iso,
+        "chapters": chapters,
+    }
+
+
+def load_pages(pages_dir, count):
+    if pages_dir:
+        names = sorted(name for name in os.listdir(pages_dir) if name.endswith(".html"))
+        pages = []
+        for name in names[:count] if count else names:
+            with open(os.path.join(pages_dir, name), "r", encoding="utf-8") as f:
+                pages.append((name[: -len(".html")], f.read()))
+        return pages
+
+    return [(f"issue-{i}", make_page(f"issue-{i}")) for i in range(1, count + 1)]
+
+
+def page_url(slug):
+    return f"https://www.deeplearning.ai/the-batch/{slug}/"
+
+
+def pages_per_second(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for slug, html in pages:
+            parse(html, page_url(slug), SELECTOR)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed if elapsed else 0.0
+
+
+def check_golden(pages, golden_dir, update):
+    os.makedirs(golden_dir, exist_ok=True)
+    mismatches = []
+
+    for slug, html in pages:
+        golden_path = os.path.join(golden_dir, f"{slug}.json")
+
+        if update or not os.path.exists(golden_path):
+            golden = legacy_parse_article(html, page_url(slug), SELECTOR)
+            with open(golden_path, "w", encoding="utf-8") as f:
+                json.dump(golden, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+
+        with open(golden_path, "r", encoding="utf-8") as f:
+            if json.load(f) != extract_article(html, page_url(slug), SELECTOR):
+                mismatches.append(slug)
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the single-pass extractor against the legacy parser"
+    )
+    parser.add_argument(
+        "--pages-dir",
+        help="directory of saved <issue>.html pages (e.g. benchmarks/pages)",
+    )
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--golden-dir",
+        help="directory of golden <issue>.json files; missing ones are seeded "
+        "from the legacy parser (e.g. benchmarks/golden)",
+    )
+    parser.add_argument(
+        "--update-golden",
+        action="store_true",
+        help="re-seed every golden file from the legacy parser",
+    )
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir, args.count)
+
+    mismatches = [
+        slug
+        for slug, html in pages
+        if legacy_parse_article(html, page_url(slug), SELECTOR)
+        != extract_article(html, page_url(slug), SELECTOR)
+    ]
+    print(
+        f"Legacy vs single-pass: {len(pages) - len(mismatches)}/{len(pages)} identical"
+    )
+    for slug in mismatches:
+        print(f"  mismatch: {slug}")
+
+    if args.golden_dir:
+        golden_mismatches = check_golden(pages, args.golden_dir, args.update_golden)
+        print(f"Golden files: {len(golden_mismatches)} mismatches in {args.golden_dir}")
+        for slug in golden_mismatches:
+            print(f"  mismatch: {slug}")
+        mismatches += golden_mismatches
+
+    legacy_rate = pages_per_second(legacy_parse_article, pages, args.repeat)
+    new_rate = pages_per_second(extract_article, pages, args.repeat)
+    print(f"legacy (html.parser, multi-pass): {legacy_rate:.1f} pages/s")
+    print(f"single-pass (lxml):               {new_rate:.1f} pages/s")
+    if legacy_rate:
+        print(f"speedup: {new_rate / legacy_rate:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import zlib
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_TEMPLATE = """<html><head><title>The Batch: {slug}</title></head><body>
+<div id="content"><article><div><div>
+<h1>The Batch {slug}</h1>
+<div class="mt-1 text-slate-600 text-base text-sm">{date}</div>
+<p>Dear friends, this is a stand-in issue used for offline benchmarks.</p>
+<h2 id="news">News</h2>
+{chapters}
+</div></div></article></div>
+</body></html>
+"""
+
+CHAPTER_TEMPLATE = """<hr>
+<h2>{title}</h2>
+<p>{paragraph}</p>
+<p><strong>Why it matters:</strong> {paragraph}</p>
+{images}
+"""
+
+WORDS = (
+    "model training data agents benchmark inference transformer dataset "
+    "vision language robotics policy chips compute open weights research "
+    "startup regulation safety evaluation latency tokens multimodal"
+).split()
+
+
+def make_png(seed, size=32):
+    rng = random.Random(seed)
+    color = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + color * size for _ in range(size))
+
+    def chunk(kind, data):
+        body = kind + data
+        return (
+            struct.pack(">I", len(data))
+            + body
+            + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_page(slug, chapters=6, images_per_chapter=2, shared_images=1):
+    rng = random.Random(slug)
+    month = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"][rng.randrange(6)]
+    date = f"{month} {rng.randrange(1, 28):02d}, {rng.choice([2022, 2023, 2024])}"
+
+    blocks = []
+    for index in range(chapters):
+        title = " ".join(rng.choice(WORDS) for _ in range(5)).title()
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(120))
+        images = [
+            f'<img src="/images/{slug}-{index}-{k}.png" alt="figure">'
+            for k in range(images_per_chapter)
+        ]
+        images += [
+            f'<img src="/images/shared-{k}.png" alt="banner">'
+            for k in range(shared_images)
+        ]
+        blocks.append(
+            CHAPTER_TEMPLATE.format(
+                title=title, paragraph=paragraph, images="\n".join(images)
+            )
+        )
+
+    return PAGE_TEMPLATE.format(slug=slug, date=date, chapters="".join(blocks))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.fail_rate and random.random() < server.fail_rate:
+            server.count("failures")
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, content_type = server.resolve(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            server.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        body, content_type = self.server.resolve(self.path)
+        self.send_response(200 if body is not None else 404)
+        if body is not None:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"' + hashlib.sha1(body).hexdigest() + '"')
+        self.end_headers()
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        fail_rate=0.0,
+        pages_dir=None,
+        images_dir=None,
+        chapters=6,
+        images_per_chapter=2,
+    ):
+        super().__init__((host, port), FixtureHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.pages_dir = pages_dir
+        self.images_dir = images_dir
+        self.chapters = chapters
+        self.images_per_chapter = images_per_chapter
+        self.counters = {}
+        self.counters_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def issue_urls(self, count, start=1):
+        if self.pages_dir:
+            slugs = sorted(
+                name[: -len(".html")]
+                for name in os.listdir(self.pages_dir)
+                if name.endswith(".html")
+            )[:count]
+        else:
+            slugs = [f"issue-{i}" for i in range(start, start + count)]
+        return [f"{self.base_url}/the-batch/{slug}/" for slug in slugs]
+
+    def count(self, name):
+        with self.counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def resolve(self, path):
+        path = path.split("?", 1)[0]
+        parts = [part for part in path.split("/") if part]
+
+        if len(parts) == 2 and parts[0] == "the-batch":
+            slug = parts[1]
+            if self.pages_dir:
+                page_path = os.path.join(self.pages_dir, f"{slug}.html")
+                if not os.path.exists(page_path):
+                    return None, None
+                with open(page_path, "rb") as f:
+                    return f.read(), "text/html; charset=utf-8"
+            page = make_page(slug, self.chapters, self.images_per_chapter)
+            return page.encode("utf-8"), "text/html; charset=utf-8"
+
+        if len(parts) == 2 and parts[0] == "images":
+            name = parts[1]
+            if self.images_dir:
+                image_path = os.path.join(self.images_dir, name)
+                if os.path.exists(image_path):
+                    with open(image_path, "rb") as f:
+                        return f.read(), "image/png"
+            return make_png(name), "image/png"
+
+        return None, None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stand-in Batch issue pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--pages-dir")
+    parser.add_argument("--images-dir")
+    args = parser.parse_args()
+
+    server = FixtureServer(
+        port=args.port,
+        latency=args.latency,
+        fail_rate=args.fail_rate,
+        pages_dir=args.pages_dir,
+        images_dir=args.images_dir,
+    )
+    print(f"Serving stand-in Batch pages at {server.base_url}/the-batch/issue-1/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import use_stub_models, build_engine, synthetic_results, sample_questions
+from fixture_server import FixtureServer
+from image_processor import StubCaptioner, configure_captioning
+from fetcher import AsyncFetcher
+from scrapper import scrape_with_selector_parallel, CSS_SELECTOR
+from vector_store import setup_chromadb, data_load
+
+SCENARIOS = ("scrape", "ingest", "query")
+
+
+def percentiles(seconds):
+    millis = np.array(seconds or [0.0]) * 1000
+    return {
+        "count": len(seconds),
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p95_ms": round(float(np.percentile(millis, 95)), 3),
+        "p99_ms": round(float(np.percentile(millis, 99)), 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def bench_scrape(args, root):
+    images_dir = os.path.join(root, "scrape-images")
+    with FixtureServer(latency=args.latency, pages_dir=args.pages_dir) as server:
+        urls = server.issue_urls(args.issues)
+        start = time.perf_counter()
+        results = scrape_with_selector_parallel(
+            urls,
+            CSS_SELECTOR,
+            images_dir,
+            max_workers=args.max_workers,
+            fetcher_factory=lambda: AsyncFetcher(
+                per_host_concurrency=args.max_workers,
+                per_host_rate=args.per_host_rate,
+                backoff=0.05,
+            ),
+        )
+        elapsed = time.perf_counter() - start
+
+    succeeded = [result for result in results if result["status"] == "success"]
+    chapters = sum(len(result["chapters"]) for result in succeeded)
+    images = sum(
+        len(chapter["images"]) for result in succeeded for chapter in result["chapters"]
+    )
+    return results, {
+        "pages": len(results),
+        "errors": len(results) - len(succeeded),
+        "chapters": chapters,
+        "images": images,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(results) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def bench_ingest(args, root, scraped_results):
+    runs = []
+    corpora = [("scraped", scraped_results)] if scraped_results else []
+    corpora.append(("synthetic", synthetic_results(args.ingest_chapters)))
+
+    for name, results in corpora:
+        chapters = sum(
+            len(result["chapters"])
+            for result in results
+            if result["status"] == "success"
+        )
+        db_path = os.path.join(root, f"ingest-{name}")
+        vector_store, _, _ = setup_chromadb(db_path, backend=args.backend)
+        start = time.perf_counter()
+        data_load(results, vector_store, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        runs.append(
+            {
+                "corpus": name,
+                "chapters": chapters,
+                "seconds": round(elapsed, 3),
+                "chapters_per_sec": round(chapters / elapsed, 2) if elapsed else 0.0,
+            }
+        )
+    return runs
+
+
+def bench_query(args, root):
+    runs = []
+    for size in args.corpus_sizes:
+        engine = build_engine(os.path.join(root, f"query-{size}"), size, args.backend)
+        questions = sample_questions(args.queries, seed=size)
+
+        for mode in ("search", "query"):
+            engine.answer_cache.clear()
+            latencies = []
+            for i, question in enumerate(questions):
+                question = f"{question} ({mode} {i})"
+                start = time.perf_counter()
+                if mode == "search":
+                    engine.search(question)
+                else:
+                    engine.query(question)
+                latencies.append(time.perf_counter() - start)
+            row = {"corpus_size": size, "mode": mode, **percentiles(latencies)}
+            if mode == "query":
+                row["tokens_saved_per_query"] = round(
+                    engine.context_summary()["tokens_saved_per_query"], 1
+                )
+            runs.append(row)
+    return runs
+
+
+def run(args):
+    use_stub_models(
+        llm_latency=args.llm_latency,
+        token_delay=0.0,
+        embed_latency=args.embed_latency,
+    )
+    report = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "settings": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        configure_captioning(
+            StubCaptioner(latency=args.caption_latency),
+            cache_path=os.path.join(root, "caption_cache.sqlite"),
+        )
+
+        scraped_results = []
+        if "scrape" in args.scenarios:
+            scraped_results, stats = bench_scrape(args, root)
+            report["results"]["scrape"] = stats
+            print(f"scrape: {stats}")
+        if "ingest" in args.scenarios:
+            report["results"]["ingest"] = bench_ingest(args, root, scraped_results)
+            for stats in report["results"]["ingest"]:
+                print(f"ingest: {stats}")
+        if "query" in args.scenarios:
+            report["results"]["query"] = bench_query(args, root)
+            for stats in report["results"]["query"]:
+                print(f"query: {stats}")
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline scrape / ingest / query benchmarks with stub models"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS
+    )
+    parser.add_argument("--backend", default="numpy", choices=["chroma", "numpy"])
+    parser.add_argument("--pages-dir", help="Serve recorded issue pages from here")
+    parser.add_argument("--issues", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-workers", type=int, default=10)
+    parser.add_argument("--per-host-rate", type=float, default=500.0)
+    parser.add_argument("--caption-latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency", type=float, default=0.005)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--ingest-chapters", type=int, default=1000)
+    parser.add_argument(
+        "--corpus-sizes", type=int, nargs="+", default=[500, 2000, 8000]
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+    if args.pages_dir:
+        args.pages_dir = os.path.abspath(args.pages_dir)
+    output = os.path.abspath(args.output)
+
+    report = run(args)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import use_stub_models, build_engine, sample_questions
+from image_processor import StubCaptioner, configure_captioning
+from server import create_app
+
+
+def start_server(app):
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    started = threading.Event()
+    address = {}
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        address["port"] = runner.addresses[0][1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="service", daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{address['port']}"
+
+
+async def run_level(base_url, endpoint, questions, concurrency):
+    latencies = []
+    errors = 0
+    pending = iter(questions)
+
+    async def client(session):
+        nonlocal errors
+        for question in pending:
+            start = time.perf_counter()
+            try:
+                async with session.post(
+                    f"{base_url}/{endpoint}", json={"question": question}
+                ) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        async with session.get(f"{base_url}/health") as response:
+            health = await response.json()
+
+    latencies = np.array(latencies or [0.0]) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(questions),
+        "errors": errors,
+        "throughput_rps": round(len(questions) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "embedding_batches": health["embedding_batches"],
+    }
+
+
+def run(args):
+    use_stub_models(
+        llm_latency=args.llm_latency,
+        token_delay=args.token_delay,
+        embed_latency=args.embed_latency,
+    )
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        configure_captioning(StubCaptioner(), cache_path=None)
+        engine = build_engine(os.path.join(root, "db"), args.chapters, args.backend)
+
+        report = []
+        for concurrency in args.concurrency:
+            engine.answer_cache.clear()
+            app = create_app(
+                engine,
+                llm_concurrency=args.llm_concurrency,
+                batch_window_ms=args.batch_window_ms,
+            )
+            base_url = start_server(app)
+            questions = [
+                f"{question} ({i})"
+                for i, question in enumerate(sample_questions(args.requests))
+            ]
+            row = asyncio.run(
+                run_level(base_url, args.endpoint, questions, concurrency)
+            )
+            report.append(row)
+            print(
+                f"{args.endpoint:<7} c={concurrency:<4} {row['throughput_rps']:>8.1f} req/s  "
+                f"p50 {row['p50_ms']:>8.1f}ms  p95 {row['p95_ms']:>8.1f}ms  "
+                f"p99 {row['p99_ms']:>8.1f}ms  "
+                f"embed batch {row['embedding_batches']['mean_batch_size']:.1f}"
+            )
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load-test the HTTP query service with stub models"
+    )
+    parser.add_argument(
+        "--endpoint", default="search", choices=["search", "query", "stream"]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--chapters", type=int, default=2000)
+    parser.add_argument("--backend", default="numpy", choices=["chroma", "numpy"])
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.005)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--batch-window-ms", type=float, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = run(args)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import random
+import hashlib
+from datetime import date, timedelta
+from typing import Any, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from fixture_server import WORDS
+
+
+class StubEmbedding(BaseEmbedding):
+    model_name: str = "stub-hash-embedding"
+    dim: int = 384
+    latency: float = 0.005
+    per_item_latency: float = 0.0005
+    max_words: int = 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StubEmbedding"
+
+    def vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = text.lower().split()
+        for word in words[: self.max_words] if self.max_words else words:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def forward(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency + self.per_item_latency * len(texts))
+        return [self.vector(text) for text in texts]
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        return self.forward(queries)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.forward([query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self.forward([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.forward(texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+
+class StubLLM(MockLLM):
+    latency: float = 0.5
+    token_delay: float = 0.0
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        time.sleep(self.latency)
+        return super().complete(prompt, formatted=formatted, **kwargs)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        time.sleep(self.latency)
+        for chunk in super().stream_complete(prompt, formatted=formatted, **kwargs):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield chunk
+
+
+def use_stub_models(llm_latency=0.5, token_delay=0.0, embed_latency=0.005, max_words=0):
+    import vector_store
+
+    embed_model = StubEmbedding(latency=embed_latency, max_words=max_words)
+    with vector_store._embed_models_lock:
+        vector_store._embed_models[vector_store.EMBED_MODEL_NAME] = embed_model
+    Settings.embed_model = embed_model
+    llm = StubLLM(max_tokens=64)
+    llm.latency = llm_latency
+    llm.token_delay = token_delay
+    Settings.llm = llm
+    return embed_model, llm
+
+
+def synthetic_results(
+    chapters, chapters_per_article=8, seed=0, words=120, vocabulary=WORDS
+):
+    rng = random.Random(seed)
+    start = date(2019, 1, 1)
+    results = []
+
+    for article in range(0, chapters, chapters_per_article):
+        article_id = f"issue-{article // chapters_per_article}"
+        published = (start + timedelta(days=7 * len(results))).isoformat()
+        url = f"https://example.test/the-batch/{article_id}/"
+        result = {"status": "success", "url": url, "chapters": []}
+
+        for index in range(min(chapters_per_article, chapters - article)):
+            content = " ".join(rng.choice(vocabulary) for _ in range(words))
+            result["chapters"].append(
+                {
+                    "id": f"{article_id}-{index:03d}",
+                    "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+                    "content": content,
+                    "url": url,
+                    "published_date": published,
+                    "article_id": article_id,
+                    "images": [],
+                }
+            )
+        results.append(result)
+
+    return results
+
+
+def sample_questions(count, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(count)]
+
+
+def build_engine(
+    db_path, chapters, backend="numpy", layout="chapter", words=120, vocabulary=WORDS
+):
+    from chat_engine import RAGEngine
+    from vector_store import setup_chromadb, data_load, bump_collection_version
+
+    vector_store, _, _ = setup_chromadb(db_path, backend=backend)
+    data_load(
+        synthetic_results(chapters, words=words, vocabulary=vocabulary),
+        vector_store,
+        layout=layout,
+    )
+    bump_collection_version(db_path)
+    return RAGEngine(db_path, backend=backend, layout=layout)
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.schema import TextNode, NodeRelationship, RelatedNodeInfo
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from numpy_store import NumpyVectorStore, QUANTIZATIONS
+
+
+def make_corpus(size, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(corpus, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), size=count)]
+    queries = picks + 0.3 * rng.normal(size=picks.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def make_nodes(vectors):
+    nodes = []
+    for i, vector in enumerate(vectors):
+        node = TextNode(
+            id_=f"chunk-{i}",
+            text=f"chunk {i}",
+            metadata={"title": f"Article {i // 8}", "published_ts": i},
+            embedding=vector.tolist(),
+        )
+        node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+            node_id=f"chapter-{i // 8}"
+        )
+        nodes.append(node)
+    return nodes
+
+
+def exact_top_k(corpus, queries, top_k):
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:top_k].tolist()) for row in scores]
+
+
+def measure(store, queries, truth, top_k):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = store.query(
+            VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=top_k)
+        )
+        latencies.append(time.perf_counter() - start)
+        found = {int(node_id.rsplit("-", 1)[1]) for node_id in result.ids}
+        hits += len(found & expected)
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "recall": round(hits / (len(queries) * top_k), 4),
+    }
+
+
+def build_numpy(nodes, root, quantization):
+    store = NumpyVectorStore(
+        os.path.join(root, f"numpy-{quantization}"),
+        quantization=quantization,
+        auto_persist=False,
+    )
+    start = time.perf_counter()
+    for offset in range(0, len(nodes), 1000):
+        store.add(nodes[offset : offset + 1000])
+    store.persist()
+    return store, time.perf_counter() - start
+
+
+def build_chroma(nodes, root):
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    client = chromadb.PersistentClient(path=os.path.join(root, "chroma"))
+    collection = client.get_or_create_collection("bench")
+    store = ChromaVectorStore(chroma_collection=collection)
+    start = time.perf_counter()
+    for offset in range(0, len(nodes), 1000):
+        store.add(nodes[offset : offset + 1000])
+    return store, time.perf_counter() - start
+
+
+def run(sizes, dim, queries_count, top_k, backends):
+    report = []
+    for size in sizes:
+        corpus = make_corpus(size, dim, clusters=max(8, size // 200))
+        queries = make_queries(corpus, queries_count)
+        truth = exact_top_k(corpus, queries, top_k)
+        nodes = make_nodes(corpus)
+
+        with tempfile.TemporaryDirectory() as root:
+            for backend in backends:
+                if backend == "chroma":
+                    try:
+                        store, build_seconds = build_chroma(nodes, root)
+                    except ImportError:
+                        print("chromadb is not installed, skipping chroma backend")
+                        continue
+                else:
+                    store, build_seconds = build_numpy(nodes, root, backend)
+
+                stats = measure(store, queries, truth, top_k)
+                row = {
+                    "size": size,
+                    "backend": backend,
+                    "build_seconds": round(build_seconds, 2),
+                    **stats,
+                }
+                report.append(row)
+                print(
+                    f"{size:>7} {backend:<8} build {row['build_seconds']:>6.2f}s  "
+                    f"p50 {row['p50_ms']:>8.3f}ms  p99 {row['p99_ms']:>8.3f}ms  "
+                    f"recall@{top_k} {row['recall']:.4f}"
+                )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare Chroma and the NumPy exact-search backend"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["chroma", *QUANTIZATIONS])
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.dim, args.queries, args.top_k, args.backends)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
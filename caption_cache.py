@@ -0,0 +1,66 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def image_digest(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class CaptionCache:
+    def __init__(self, path="data/caption_cache.sqlite"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS captions (
+                digest TEXT NOT NULL,
+                captioner TEXT NOT NULL,
+                caption TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (digest, captioner)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_many(self, digests, captioner):
+        digests = list(set(digests))
+        found = {}
+
+        with self.lock:
+            for start in range(0, len(digests), 500):
+                chunk = digests[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self.conn.execute(
+                    f"SELECT digest, caption FROM captions "
+                    f"WHERE captioner = ? AND digest IN ({placeholders})",
+                    [captioner, *chunk],
+                ).fetchall()
+                found.update(rows)
+
+        return found
+
+    def get(self, digest, captioner):
+        return self.get_many([digest], captioner).get(digest)
+
+    def put(self, digest, captioner, caption):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO captions VALUES (?, ?, ?, ?)",
+                (digest, captioner, caption, time.time()),
+            )
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
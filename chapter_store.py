@@ -0,0 +1,132 @@
+import os
+import json
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = "data/chroma_db"
+
+
+def chapter_store_path(db_path=None):
+    return os.path.join(db_path or DEFAULT_DB_PATH, "chapters.sqlite")
+
+
+def chapter_record(document):
+    return metadata_record(document.doc_id, document.metadata)
+
+
+def metadata_record(chapter_id, metadata):
+    return {
+        "chapter_id": chapter_id,
+        "article_id": metadata.get("article_id", ""),
+        "url": metadata.get("url", ""),
+        "title": metadata.get("title", ""),
+        "published_date": metadata.get("published_date", ""),
+        "published_ts": metadata.get("published_ts", 0),
+        "images": metadata.get("images", []),
+    }
+
+
+class ChapterStore:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chapters (
+                chapter_id TEXT PRIMARY KEY,
+                article_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                published_date TEXT NOT NULL,
+                published_ts INTEGER NOT NULL,
+                images TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def put_many(self, records):
+        rows = [
+            (
+                record["chapter_id"],
+                record["article_id"],
+                record["url"],
+                record["title"],
+                record["published_date"],
+                record["published_ts"],
+                json.dumps(record["images"]),
+            )
+            for record in records
+        ]
+        if not rows:
+            return
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def get_images(self, chapter_ids):
+        chapter_ids = list(set(chapter_ids))
+        found = {}
+
+        with self.lock:
+            for start in range(0, len(chapter_ids), 500):
+                chunk = chapter_ids[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                for chapter_id, images in self.conn.execute(
+                    f"SELECT chapter_id, images FROM chapters "
+                    f"WHERE chapter_id IN ({placeholders})",
+                    chunk,
+                ):
+                    found[chapter_id] = json.loads(images)
+
+        return found
+
+    def delete(self, chapter_ids):
+        chapter_ids = list(chapter_ids)
+
+        with self.lock:
+            for start in range(0, len(chapter_ids), 500):
+                chunk = chapter_ids[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                self.conn.execute(
+                    f"DELETE FROM chapters WHERE chapter_id IN ({placeholders})", chunk
+                )
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM chapters")
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_chapter_store = None
+_chapter_store_lock = threading.Lock()
+
+
+def configure_chapter_store(db_path=None):
+    global _chapter_store
+    path = chapter_store_path(db_path)
+    with _chapter_store_lock:
+        if _chapter_store is None or _chapter_store.path != path:
+            _chapter_store = ChapterStore(path)
+        return _chapter_store
+
+
+def get_chapter_store():
+    with _chapter_store_lock:
+        store = _chapter_store
+    return store if store is not None else configure_chapter_store()
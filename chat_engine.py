@@ -1,8 +1,18 @@
-from typing import Tuple, List, Dict
-from vector_store import get_existing_index
+import os
+import time
+import threading
+from typing import Tuple, List, Dict, Iterator
 from llama_index.core.prompts import PromptTemplate
-from llama_index.core import Settings
-from datetime import datetime
+from llama_index.core import Settings, get_response_synthesizer
+from llama_index.core.schema import QueryBundle
+
+import tracing
+from answer_cache import AnswerCache
+from chapter_store import ChapterStore, chapter_store_path
+from context import ContextAssembler
+from dedup import covered_urls, dedup_path
+from retriever import RecencyRetriever
+from tiers import load_tiers, tiered_retriever
 
 QA_TEMPLATE = PromptTemplate(
     """You are an AI assistant helping with questions about AI and machine learning news from "The Batch" newsletter.
@@ -19,40 +29,134 @@ QA_TEMPLATE = PromptTemplate(
 
 
 class RAGEngine:
-    def __init__(self, db_path="data/chroma_db"):
-        self.index = get_existing_index(db_path)
+    def __init__(
+        self,
+        db_path="data/chroma_db",
+        answer_cache: AnswerCache = None,
+        backend: str = None,
+        token_budget: int = None,
+        layout: str = None,
+    ):
+        from vector_store import get_existing_index, collection_version, CHUNK_LAYOUT
+
+        self.db_path = db_path
+        self.chapter_store = ChapterStore(chapter_store_path(db_path))
+        self.ready = False
+        self.warmup_seconds = None
+        self.answer_cache = answer_cache or AnswerCache(
+            version_getter=lambda: collection_version(db_path)
+        )
+        self.layout = layout or CHUNK_LAYOUT
+        candidate_k = 30 if self.layout == "hierarchical" else 10
+        if load_tiers(db_path):
+            self.index, self.retriever = tiered_retriever(
+                db_path, backend=backend, candidate_k=candidate_k
+            )
+        else:
+            self.index = get_existing_index(db_path, backend=backend)
+            self.retriever = (
+                RecencyRetriever(self.index, candidate_k=candidate_k)
+                if self.index
+                else None
+            )
         if not self.index:
             raise ValueError("No index found in the specified path")
-        self.query_engine = self.index.as_query_engine(
-            similarity_top_k=5, text_qa_template=QA_TEMPLATE
+        if len(self.chapter_store) == 0:
+            print(
+                f"Chapter store {self.chapter_store.path} is empty; images are only "
+                "shown for nodes that still carry them inline. Run "
+                "`python scrapper.py migrate-chapter-store` or rebuild the index."
+            )
+        self.context_assembler = ContextAssembler()
+        if token_budget is not None:
+            self.context_assembler.token_budget = token_budget
+        self.context_stats = {"queries": 0, "full_tokens": 0, "prompt_tokens": 0}
+        self.context_lock = threading.Lock()
+        self.synthesizer = get_response_synthesizer(text_qa_template=QA_TEMPLATE)
+        self.streaming_synthesizer = get_response_synthesizer(
+            text_qa_template=QA_TEMPLATE, streaming=True
         )
 
-    def query(
-        self, question: str, chat_history: List[dict] = None
-    ) -> Tuple[str, List[Dict]]:
-        response = self.query_engine.query(question)
-        used_sources = []
-        all_nodes = []
-
-        for node in response.source_nodes:
-            if node.score >= 0.4:
-                date_str = node.metadata.get("published_date", "")
-                try:
-                    date = (
-                        datetime.strptime(date_str, "%Y-%m-%d")
-                        if date_str
-                        else datetime.min
-                    )
-                except ValueError:
-                    date = datetime.min
+    def warm_up(self):
+        start = time.perf_counter()
+        Settings.embed_model.get_query_embedding("warm up")
+        self.index.as_retriever(similarity_top_k=1).retrieve("latest AI news")
+        self.warmup_seconds = time.perf_counter() - start
+        self.ready = True
+
+    def health(self):
+        return {
+            "state": "ready" if self.ready else "warming",
+            "ready": self.ready,
+            "db_path": self.db_path,
+            "warmup_seconds": self.warmup_seconds,
+            "answer_cache": self.answer_cache.stats(),
+            "context": self.context_summary(),
+        }
+
+    def context_summary(self):
+        with self.context_lock:
+            stats = dict(self.context_stats)
+        saved = stats["full_tokens"] - stats["prompt_tokens"]
+        stats["token_budget"] = self.context_assembler.token_budget
+        stats["tokens_saved"] = saved
+        stats["tokens_saved_per_query"] = (
+            saved / stats["queries"] if stats["queries"] else 0.0
+        )
+        return stats
+
+    def assemble_context(self, selected_nodes, query_bundle):
+        with tracing.span("assemble") as assemble:
+            nodes, report = self.context_assembler.assemble(
+                selected_nodes, query_bundle
+            )
+            assemble.set(**report)
+        with self.context_lock:
+            self.context_stats["queries"] += 1
+            self.context_stats["full_tokens"] += report["full_tokens"]
+            self.context_stats["prompt_tokens"] += report["prompt_tokens"]
+        return nodes, report
+
+    def lookup_answer(self, question: str, embedding: List[float] = None):
+        cached = self.answer_cache.get_exact(question)
+        if cached is not None:
+            return cached, embedding
+
+        if embedding is None:
+            embedding = Settings.embed_model.get_query_embedding(question)
+        return self.answer_cache.get_semantic(embedding), embedding
+
+    @staticmethod
+    def cached_events(cached):
+        response_str, used_sources = cached
+        yield {"type": "sources", "sources": used_sources}
+        yield {"type": "token", "text": response_str}
+        yield {"type": "done", "answer": response_str, "sources": used_sources}
 
-                all_nodes.append((date, node))
+    def retriever_for(self, date_from=None, date_to=None):
+        if date_from or date_to:
+            return self.retriever.with_date_range(date_from, date_to)
+        return self.retriever
+
+    def build_sources(
+        self, selected_nodes, question: str, response_text: str = ""
+    ) -> List[Dict]:
+        used_sources = []
+        response_text = response_text.lower()
+        covered = covered_urls(
+            (node.node.ref_doc_id for node in selected_nodes), dedup_path(self.db_path)
+        )
 
-        all_nodes.sort(key=lambda x: x[0], reverse=True)
-        selected_nodes = all_nodes[:3]
+        stored_images = self.chapter_store.get_images(
+            node.node.ref_doc_id
+            for node in selected_nodes
+            if "images" not in node.metadata
+        )
 
-        response_text = str(response).lower()
-        for _, node in selected_nodes:
+        for node in selected_nodes:
+            images = node.metadata.get("images")
+            if images is None:
+                images = stored_images.get(node.node.ref_doc_id, [])
             source_info = {
                 "title": node.metadata.get("title", ""),
                 "url": node.metadata.get("url", ""),
@@ -62,12 +166,13 @@ class RAGEngine:
                     node.text[:500] + "..." if len(node.text) > 500 else node.text
                 ),
                 "images": [],
+                "covered_urls": covered.get(node.node.ref_doc_id, []),
             }
 
-            for img in node.metadata.get("images", []):
+            for img in images:
                 img_caption = img.get("caption", "").lower()
                 if (
-                    img_caption in response_text
+                    (response_text and img_caption in response_text)
                     or any(word in img_caption for word in question.lower().split())
                     or node.score >= 0.7
                 ):
@@ -75,6 +180,7 @@ class RAGEngine:
                         {
                             "url": img["url"],
                             "caption": img["caption"],
+                            "path": img.get("path", ""),
                             "score": node.score,
                         }
                     )
@@ -83,17 +189,199 @@ class RAGEngine:
                 used_sources.append(source_info)
 
         used_sources.sort(key=lambda x: (bool(x["images"]), x["score"]), reverse=True)
+        return used_sources
 
-        response_str = str(response)
-        if used_sources:
-            newest_date = used_sources[0]["date"]
-            response_str = (
-                f"Based on articles as recent as {newest_date}:\n\n{response_str}"
-            )
+    def response_prefix(self, used_sources: List[Dict]) -> str:
+        if not used_sources:
+            return ""
+        return f"Based on articles as recent as {used_sources[0]['date']}:\n\n"
 
-            if any(source["images"] for source in used_sources):
-                response_str += (
-                    "\n\n*Related visualizations are available in the sources below.*"
+    def response_suffix(self, used_sources: List[Dict]) -> str:
+        if any(source["images"] for source in used_sources):
+            return "\n\n*Related visualizations are available in the sources below.*"
+        return ""
+
+    def search(
+        self,
+        question: str,
+        date_from: str = None,
+        date_to: str = None,
+        embedding: List[float] = None,
+    ) -> List[Dict]:
+        with tracing.trace("rag.search"):
+            with tracing.span("embed"):
+                if embedding is None:
+                    embedding = Settings.embed_model.get_query_embedding(question)
+            with tracing.span("retrieve") as retrieve:
+                selected_nodes = self.retriever_for(date_from, date_to).retrieve(
+                    QueryBundle(question, embedding=embedding)
                 )
+                retrieve.set(nodes=len(selected_nodes))
+            with tracing.span("postprocess"):
+                return self.build_sources(selected_nodes, question)
+
+    def query(
+        self,
+        question: str,
+        chat_history: List[dict] = None,
+        date_from: str = None,
+        date_to: str = None,
+        embedding: List[float] = None,
+    ) -> Tuple[str, List[Dict]]:
+        with tracing.trace("rag.query") as request:
+            use_cache = not (date_from or date_to)
+            if use_cache:
+                with tracing.span("embed"):
+                    cached, embedding = self.lookup_answer(question, embedding)
+                if cached is not None:
+                    request.set(cache_hit=True)
+                    return cached
+
+            if embedding is None:
+                with tracing.span("embed"):
+                    embedding = Settings.embed_model.get_query_embedding(question)
+            query_bundle = QueryBundle(question, embedding=embedding)
+            with tracing.span("retrieve") as retrieve:
+                selected_nodes = self.retriever_for(date_from, date_to).retrieve(
+                    query_bundle
+                )
+                retrieve.set(nodes=len(selected_nodes))
+            context_nodes, report = self.assemble_context(selected_nodes, query_bundle)
+            request.set(tokens_saved=report["tokens_saved"])
+            with tracing.span("synthesize"):
+                response = self.synthesizer.synthesize(
+                    query_bundle, nodes=context_nodes
+                )
+
+            with tracing.span("postprocess"):
+                used_sources = self.build_sources(
+                    selected_nodes, question, str(response)
+                )
+                response_str = (
+                    self.response_prefix(used_sources)
+                    + str(response)
+                    + self.response_suffix(used_sources)
+                )
+                if use_cache:
+                    self.answer_cache.put(
+                        question, embedding, (response_str, used_sources)
+                    )
+            return response_str, used_sources
+
+    def query_stream(
+        self,
+        question: str,
+        chat_history: List[dict] = None,
+        date_from: str = None,
+        date_to: str = None,
+        embedding: List[float] = None,
+    ) -> Iterator[Dict]:
+        yield from tracing.isolated(
+            self._traced_query_stream(question, date_from, date_to, embedding)
+        )
+
+    def _traced_query_stream(self, question, date_from, date_to, embedding):
+        with tracing.trace("rag.query_stream") as request:
+            yield from self._query_stream(
+                request, question, date_from, date_to, embedding
+            )
+
+    def _query_stream(self, request, question, date_from, date_to, embedding):
+        use_cache = not (date_from or date_to)
+        if use_cache:
+            with tracing.span("embed"):
+                cached, embedding = self.lookup_answer(question, embedding)
+            if cached is not None:
+                request.set(cache_hit=True)
+                yield from self.cached_events(cached)
+                return
+
+        if embedding is None:
+            with tracing.span("embed"):
+                embedding = Settings.embed_model.get_query_embedding(question)
+        query_bundle = QueryBundle(question, embedding=embedding)
+        with tracing.span("retrieve") as retrieve:
+            selected_nodes = self.retriever_for(date_from, date_to).retrieve(
+                query_bundle
+            )
+            retrieve.set(nodes=len(selected_nodes))
+        with tracing.span("postprocess"):
+            used_sources = self.build_sources(selected_nodes, question)
+        yield {"type": "sources", "sources": used_sources}
+        context_nodes, report = self.assemble_context(selected_nodes, query_bundle)
+        request.set(tokens_saved=report["tokens_saved"])
+
+        parts = []
+        prefix = self.response_prefix(used_sources)
+        if prefix:
+            parts.append(prefix)
+            yield {"type": "token", "text": prefix}
+
+        started = time.perf_counter()
+        first_token_ms = None
+        response = self.streaming_synthesizer.synthesize(
+            query_bundle, nodes=context_nodes
+        )
+        for token in response.response_gen:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            parts.append(token)
+            yield {"type": "token", "text": token}
+        request.set(
+            first_token_ms=first_token_ms,
+            synthesize_ms=(time.perf_counter() - started) * 1000,
+        )
+
+        suffix = self.response_suffix(used_sources)
+        if suffix:
+            parts.append(suffix)
+            yield {"type": "token", "text": suffix}
+
+        response_str = "".join(parts)
+        if use_cache:
+            self.answer_cache.put(question, embedding, (response_str, used_sources))
+        yield {
+            "type": "done",
+            "answer": response_str,
+            "sources": used_sources,
+            "context": report,
+        }
+
+
+_engines = {}
+_engine_errors = {}
+_engines_lock = threading.Lock()
+
+
+def get_shared_engine(db_path="data/chroma_db") -> RAGEngine:
+    db_path = os.path.abspath(db_path)
+
+    with _engines_lock:
+        engine = _engines.get(db_path)
+        if engine is None:
+            try:
+                engine = RAGEngine(db_path=db_path)
+                engine.warm_up()
+            except Exception as e:
+                _engine_errors[db_path] = str(e)
+                raise
+            _engines[db_path] = engine
+            _engine_errors.pop(db_path, None)
+
+    return engine
+
+
+def engine_status(db_path="data/chroma_db") -> Dict:
+    db_path = os.path.abspath(db_path)
+    engine = _engines.get(db_path)
 
-        return response_str, used_sources
+    if engine is not None:
+        return engine.health()
+    if db_path in _engine_errors:
+        return {
+            "state": "failed",
+            "ready": False,
+            "db_path": db_path,
+            "error": _engine_errors[db_path],
+        }
+    return {"state": "loading", "ready": False, "db_path": db_path}
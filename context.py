@@ -0,0 +1,154 @@
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from embedding_cache import get_model_cache, text_hash
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text, min_chars=30):
+    sentences = []
+    for part in _SENTENCE_END.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and len(sentences[-1]) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def embed_sentences(nodes, batch_size=64, writes=None):
+    sentences = [sentence for node in nodes for sentence in split_sentences(node.text)]
+    if not sentences:
+        return 0
+
+    embed_model = Settings.embed_model
+    _, computed = get_model_cache(embed_model).embed(
+        sentences, embed_model.get_text_embedding_batch, batch_size, writes=writes
+    )
+    return computed
+
+
+def count_tokens(text):
+    return len(Settings.tokenizer(text)) if text else 0
+
+
+class ContextAssembler(BaseNodePostprocessor):
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+    redundancy_threshold: float = 0.9
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextAssembler"
+
+    def assemble(self, nodes: List[NodeWithScore], query_bundle: QueryBundle):
+        full_tokens = sum(
+            count_tokens(node.node.get_content(metadata_mode=MetadataMode.LLM))
+            for node in nodes
+        )
+        if self.token_budget <= 0 or not nodes:
+            return nodes, {
+                "prompt_tokens": full_tokens,
+                "full_tokens": full_tokens,
+                "tokens_saved": 0,
+            }
+
+        embedding = query_bundle.embedding
+        if embedding is None:
+            embedding = Settings.embed_model.get_query_embedding(query_bundle.query_str)
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        sentences = [split_sentences(node.node.get_content()) for node in nodes]
+        hashes = [[text_hash(sentence) for sentence in node] for node in sentences]
+        vectors = get_model_cache(Settings.embed_model).get_many(
+            [digest for node in hashes for digest in node]
+        )
+
+        candidates = []
+        for i, node in enumerate(nodes):
+            for position, digest in enumerate(hashes[i]):
+                vector = vectors.get(digest)
+                if vector is not None:
+                    vector = vector / (np.linalg.norm(vector) or 1.0)
+                    similarity = float(vector @ query)
+                else:
+                    similarity = node.score or 0.0
+                candidates.append((similarity, i, position, vector))
+
+        best_first = sorted(candidates, key=lambda item: item[0], reverse=True)
+        leaders = {}
+        for candidate in best_first:
+            leaders.setdefault(candidate[1], candidate)
+        ordered = [leaders[i] for i in sorted(leaders)] + best_first
+
+        overhead = [
+            count_tokens(node.node.get_metadata_str(mode=MetadataMode.LLM))
+            for node in nodes
+        ]
+        selected = {}
+        seen = set()
+        chosen_vectors = []
+        used = 0
+
+        for similarity, i, position, vector in ordered:
+            digest = hashes[i][position]
+            if digest in seen:
+                continue
+
+            cost = count_tokens(sentences[i][position])
+            if i not in selected:
+                cost += overhead[i]
+            if used + cost > self.token_budget:
+                continue
+
+            seen.add(digest)
+            if vector is not None and chosen_vectors:
+                overlap = np.max(np.stack(chosen_vectors) @ vector)
+                if overlap >= self.redundancy_threshold:
+                    continue
+
+            selected.setdefault(i, []).append(position)
+            if vector is not None:
+                chosen_vectors.append(vector)
+            used += cost
+
+        assembled = []
+        for i, node in enumerate(nodes):
+            if i not in selected:
+                continue
+
+            trimmed = node.node.model_copy()
+            trimmed.set_content(
+                " ".join(sentences[i][position] for position in sorted(selected[i]))
+            )
+            assembled.append(NodeWithScore(node=trimmed, score=node.score))
+
+        prompt_tokens = sum(
+            count_tokens(node.node.get_content(metadata_mode=MetadataMode.LLM))
+            for node in assembled
+        )
+        return assembled, {
+            "prompt_tokens": prompt_tokens,
+            "full_tokens": full_tokens,
+            "tokens_saved": full_tokens - prompt_tokens,
+        }
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            return nodes
+        return self.assemble(nodes, query_bundle)[0]
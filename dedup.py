@@ -0,0 +1,365 @@
+import os
+import re
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+DEFAULT_DB_PATH = "data/chroma_db"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def dedup_path(db_path=None):
+    return os.path.join(db_path or DEFAULT_DB_PATH, "dedup.sqlite")
+
+
+def shingle_hashes(text, shingle_size=5):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < shingle_size:
+        return np.empty(0, dtype=np.uint64)
+
+    shingles = {
+        " ".join(words[i : i + shingle_size])
+        for i in range(len(words) - shingle_size + 1)
+    }
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def lsh_params(threshold, num_perm):
+    similarities = np.linspace(0.0, 1.0, 201)
+    step = similarities[1]
+    below = similarities <= threshold
+    best = None
+
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collide = 1.0 - (1.0 - similarities**rows) ** bands
+        false_positives = collide[below].sum() * step
+        false_negatives = (1.0 - collide[~below]).sum() * step
+        error = false_positives + false_negatives
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+
+    return best[1], best[2]
+
+
+def select_covered_urls(conn, chapter_ids):
+    chapter_ids = list(set(chapter_ids))
+    covered = {}
+
+    for start in range(0, len(chapter_ids), 500):
+        chunk = chapter_ids[start : start + 500]
+        placeholders = ",".join("?" for _ in chunk)
+        for canonical_id, url in conn.execute(
+            f"SELECT canonical_id, url FROM duplicates "
+            f"WHERE canonical_id IN ({placeholders}) ORDER BY url",
+            chunk,
+        ):
+            urls = covered.setdefault(canonical_id, [])
+            if url not in urls:
+                urls.append(url)
+
+    return covered
+
+
+def covered_urls(chapter_ids, path=None):
+    path = path or dedup_path()
+    if not os.path.exists(path):
+        return {}
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        return select_covered_urls(conn, chapter_ids)
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text, self.shingle_size)
+        if not len(hashes):
+            return None
+
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % np.uint64(
+            _MERSENNE_PRIME
+        )
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    def __init__(
+        self,
+        path=None,
+        threshold=DEDUP_THRESHOLD,
+        num_perm=128,
+        shingle_size=5,
+    ):
+        path = path or dedup_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                chapter_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                signature BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chapter_id TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_chapter ON buckets (chapter_id)"
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS duplicates (
+                chapter_id TEXT PRIMARY KEY,
+                canonical_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                similarity REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (canonical_id)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.commit()
+        self._check_layout(num_perm, shingle_size)
+
+    def _check_layout(self, num_perm, shingle_size):
+        hashing = f"{num_perm}:{shingle_size}"
+        banding = f"{self.bands}x{self.rows}"
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+
+        if meta.get("hashing", hashing) != hashing:
+            print("Near-duplicate index was built with other MinHash settings; reset")
+            self.clear()
+        elif meta.get("banding", banding) != banding:
+            self._rebuild_buckets()
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            [("hashing", hashing), ("banding", banding)],
+        )
+        self.conn.commit()
+
+    def _band_keys(self, signature):
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+            keys.append((band, int.from_bytes(digest, "little", signed=True)))
+        return keys
+
+    def _rebuild_buckets(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM buckets")
+            for chapter_id, blob in self.conn.execute(
+                "SELECT chapter_id, signature FROM signatures"
+            ).fetchall():
+                signature = np.frombuffer(blob, dtype=np.uint32)
+                self.conn.executemany(
+                    "INSERT INTO buckets VALUES (?, ?, ?)",
+                    [
+                        (band, key, chapter_id)
+                        for band, key in self._band_keys(signature)
+                    ],
+                )
+            self.conn.commit()
+
+    def _candidates(self, keys, chapter_id):
+        candidates = set()
+        for band, key in keys:
+            candidates.update(
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT chapter_id FROM buckets WHERE band = ? AND bucket = ?",
+                    (band, key),
+                )
+            )
+        candidates.discard(chapter_id)
+        return list(candidates)
+
+    def _signatures(self, chapter_ids):
+        found = {}
+        for start in range(0, len(chapter_ids), 500):
+            chunk = chapter_ids[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            for chapter_id, blob in self.conn.execute(
+                f"SELECT chapter_id, signature FROM signatures "
+                f"WHERE chapter_id IN ({placeholders})",
+                chunk,
+            ):
+                found[chapter_id] = np.frombuffer(blob, dtype=np.uint32)
+        return found
+
+    def _remove(self, chapter_ids):
+        orphans = []
+        for start in range(0, len(chapter_ids), 500):
+            chunk = chapter_ids[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            for table in ("signatures", "buckets", "duplicates"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE chapter_id IN ({placeholders})", chunk
+                )
+            orphans += self.conn.execute(
+                f"SELECT chapter_id, url FROM duplicates "
+                f"WHERE canonical_id IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            self.conn.execute(
+                f"DELETE FROM duplicates WHERE canonical_id IN ({placeholders})", chunk
+            )
+        return orphans
+
+    def filter(self, chapters):
+        signatures = [self.hasher.signature(chapter["content"]) for chapter in chapters]
+        kept = []
+        duplicates = []
+
+        with self.lock:
+            self._remove([chapter["id"] for chapter in chapters])
+
+            for chapter, signature in zip(chapters, signatures):
+                if signature is None:
+                    kept.append(chapter)
+                    continue
+
+                keys = self._band_keys(signature)
+                candidates = self._signatures(self._candidates(keys, chapter["id"]))
+                best_id, best_similarity = None, 0.0
+                for candidate_id, candidate in candidates.items():
+                    similarity = float(np.mean(candidate == signature))
+                    if similarity > best_similarity:
+                        best_id, best_similarity = candidate_id, similarity
+
+                if best_similarity >= self.threshold:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO duplicates VALUES (?, ?, ?, ?)",
+                        (chapter["id"], best_id, chapter["url"], best_similarity),
+                    )
+                    duplicates.append((chapter, best_id, best_similarity))
+                    continue
+
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)",
+                    (chapter["id"], chapter["url"], signature.tobytes()),
+                )
+                self.conn.executemany(
+                    "INSERT INTO buckets VALUES (?, ?, ?)",
+                    [(band, key, chapter["id"]) for band, key in keys],
+                )
+                kept.append(chapter)
+
+            self.conn.commit()
+
+        return kept, duplicates
+
+    def forget(self, chapter_ids):
+        chapter_ids = list(chapter_ids)
+        if not chapter_ids:
+            return []
+
+        with self.lock:
+            orphans = self._remove(chapter_ids)
+            self.conn.commit()
+        return orphans
+
+    def covered_urls(self, chapter_ids):
+        with self.lock:
+            return select_covered_urls(self.conn, chapter_ids)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "chapters": self.conn.execute(
+                    "SELECT COUNT(*) FROM signatures"
+                ).fetchone()[0],
+                "duplicates": self.conn.execute(
+                    "SELECT COUNT(*) FROM duplicates"
+                ).fetchone()[0],
+                "threshold": self.threshold,
+                "bands": self.bands,
+                "rows": self.rows,
+            }
+
+    def clear(self):
+        with self.lock:
+            for table in ("signatures", "buckets", "duplicates"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_dedup_index = None
+_dedup_threshold = DEDUP_THRESHOLD
+_dedup_db_path = None
+_dedup_lock = threading.Lock()
+
+
+def configure_dedup(threshold=None, db_path=None):
+    global _dedup_index, _dedup_threshold, _dedup_db_path
+    with _dedup_lock:
+        if threshold is not None:
+            _dedup_threshold = threshold
+        if db_path is not None:
+            _dedup_db_path = db_path
+
+        path = dedup_path(_dedup_db_path)
+        if _dedup_threshold <= 0:
+            _dedup_index = None
+        elif (
+            _dedup_index is None
+            or _dedup_index.path != path
+            or _dedup_index.threshold != _dedup_threshold
+        ):
+            _dedup_index = NearDuplicateIndex(path, _dedup_threshold)
+        return _dedup_index
+
+
+def get_dedup_index():
+    with _dedup_lock:
+        if _dedup_index is not None or _dedup_threshold <= 0:
+            return _dedup_index
+    return configure_dedup()
@@ -0,0 +1,174 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name, root="data/embedding_cache"):
+        self.model_name = model_name
+        self.root = os.path.join(root, re.sub(r"[^\w\-.]", "_", model_name))
+        os.makedirs(self.root, exist_ok=True)
+        self.vectors_path = os.path.join(self.root, "vectors.f32")
+        self.lock = threading.Lock()
+        self.matrix = None
+
+        self.conn = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite"), check_same_thread=False
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.commit()
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self.rows = self._file_rows()
+
+    def _file_rows(self, repair=False):
+        if not self.dim or not os.path.exists(self.vectors_path):
+            return 0
+
+        row_bytes = 4 * self.dim
+        size = os.path.getsize(self.vectors_path)
+        if repair and size % row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(size - size % row_bytes)
+        return size // row_bytes
+
+    def _view(self):
+        if self.matrix is None or self.matrix.shape[0] < self.rows:
+            self.matrix = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.rows, self.dim),
+            )
+        return self.matrix
+
+    def get_many(self, hashes):
+        hashes = list(set(hashes))
+        found = {}
+
+        with self.lock:
+            if self.dim is None:
+                row = self.conn.execute(
+                    "SELECT value FROM meta WHERE key = 'dim'"
+                ).fetchone()
+                self.dim = int(row[0]) if row else None
+            self.rows = max(self.rows, self._file_rows())
+            if not self.rows:
+                return found
+
+            rows = []
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows += self.conn.execute(
+                    f"SELECT hash, row FROM embeddings "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+
+            matrix = self._view()
+            for digest, row in rows:
+                if row < self.rows:
+                    found[digest] = np.array(matrix[row])
+
+        return found
+
+    def put_many(self, hashes, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(hashes):
+            return
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),)
+                )
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"cached dimension {self.dim} for {self.model_name}"
+                )
+
+            first_row = self._file_rows(repair=True)
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors).tobytes())
+            self.rows = first_row + len(hashes)
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [
+                    (self.model_name, digest, first_row + offset)
+                    for offset, digest in enumerate(hashes)
+                ],
+            )
+            self.conn.commit()
+
+    def embed(self, texts, embed_batch, batch_size=64, writes=None):
+        hashes = [text_hash(text) for text in texts]
+        cached = self.get_many(hashes)
+
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+
+        missing_hashes = list(missing)
+        for start in range(0, len(missing_hashes), batch_size):
+            batch_hashes = missing_hashes[start : start + batch_size]
+            vectors = embed_batch([missing[digest] for digest in batch_hashes])
+            if writes is None:
+                self.put_many(batch_hashes, vectors)
+            else:
+                writes.append((batch_hashes, vectors))
+            for digest, vector in zip(batch_hashes, vectors):
+                cached[digest] = np.asarray(vector, dtype=np.float32)
+
+        return [cached[digest].tolist() for digest in hashes], len(missing)
+
+    def __len__(self):
+        with self.lock:
+            return self.rows
+
+    def close(self):
+        with self.lock:
+            self.matrix = None
+            self.conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name, root="data/embedding_cache"):
+    key = (model_name, os.path.abspath(root))
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(model_name, root)
+        return _caches[key]
+
+
+def get_model_cache(embed_model, root="data/embedding_cache"):
+    model_name = getattr(embed_model, "model_name", None) or embed_model.class_name()
+    return get_embedding_cache(model_name, root)
@@ -0,0 +1,164 @@
+import datetime
+import functools
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+DATE_CLASSES = {"mt-1", "text-slate-600", "text-base", "text-sm"}
+TITLE_TAGS = {"h1", "h2", "strong"}
+SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+
+@functools.lru_cache(maxsize=32)
+def compiled_selector(selector):
+    return CSSSelector(selector.strip())
+
+
+def chapter_id(article_id, index):
+    return f"{article_id}-{index:03d}"
+
+
+def element_strings(element):
+    if not isinstance(element.tag, str) or element.tag in SKIPPED_TEXT_TAGS:
+        return
+
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from element_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def element_text(element):
+    return "".join(text.strip() for text in element_strings(element) if text.strip())
+
+
+class Block:
+    def __init__(self):
+        self.title = None
+        self.paragraphs = []
+        self.image_srcs = []
+
+
+class ChapterWalker:
+    def __init__(self):
+        self.blocks = [Block()]
+
+    def walk(self, element):
+        tag = element.tag
+        if not isinstance(tag, str):
+            return
+
+        if tag == "hr" and not element.attrib:
+            self.blocks.append(Block())
+            return
+
+        block = self.blocks[-1]
+        if tag in TITLE_TAGS and block.title is None:
+            block.title = element_text(element)
+        elif tag == "p":
+            text = element_text(element)
+            if text:
+                block.paragraphs.append(text)
+        elif tag == "img":
+            src = element.get("src")
+            if src:
+                block.image_srcs.append(src)
+
+        for child in element:
+            self.walk(child)
+
+
+def find_landmarks(container):
+    date_element = None
+    news_tag = None
+
+    for element in container.iterdescendants():
+        if not isinstance(element.tag, str):
+            continue
+        if (
+            date_element is None
+            and element.tag == "div"
+            and DATE_CLASSES.issubset(element.get("class", "").split())
+        ):
+            date_element = element
+        if (
+            news_tag is None
+            and element.tag in ("h1", "h2")
+            and element.get("id") == "news"
+        ):
+            news_tag = element
+        if date_element is not None and news_tag is not None:
+            break
+
+    return date_element, news_tag
+
+
+def parse_date(date_element):
+    published_date = element_text(date_element) if date_element is not None else ""
+    try:
+        return datetime.datetime.strptime(published_date.strip(), "%b %d, %Y").strftime(
+            "%Y-%m-%d"
+        )
+    except ValueError:
+        return ""
+
+
+def extract_article(html, url, selector):
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ValueError:
+        root = lxml.html.document_fromstring(html.encode("utf-8"))
+    containers = compiled_selector(selector)(root)
+
+    if not containers:
+        return {
+            "url": url,
+            "status": "no_matches",
+            "chapters": [],
+        }
+
+    container = containers[0]
+    article_id = url.split("/")[-2]
+    date_element, news_tag = find_landmarks(container)
+    published_date_iso = parse_date(date_element)
+
+    walker = ChapterWalker()
+    if news_tag is not None:
+        for sibling in news_tag.itersiblings():
+            walker.walk(sibling)
+    else:
+        walker.walk(container)
+
+    chapters = []
+    for i, block in enumerate(walker.blocks):
+        title = block.title if block.title is not None else f"Section {i+1}"
+
+        if "deeplearning.ai" in title.lower() or "news" in title.lower():
+            continue
+
+        section_text = " ".join(block.paragraphs)
+
+        if not section_text and not block.image_srcs:
+            continue
+
+        chapters.append(
+            {
+                "id": chapter_id(article_id, i),
+                "title": title,
+                "content": section_text,
+                "image_srcs": block.image_srcs,
+                "article_id": article_id,
+                "url": url,
+                "published_date": published_date_iso,
+            }
+        )
+
+    return {
+        "url": url,
+        "status": "success",
+        "article_id": article_id,
+        "published_date": published_date_iso,
+        "chapters": chapters,
+    }
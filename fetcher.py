@@ -0,0 +1,192 @@
+import time
+import random
+import hashlib
+import asyncio
+import urllib.parse
+
+import aiohttp
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    def __init__(self, url, status):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class FetchResponse:
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.digest = None
+        self.size = len(body)
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise FetchError(self.url, self.status)
+
+
+class HostLimiter:
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self.lock:
+                now = time.monotonic()
+                wait = self.next_slot - now
+                self.next_slot = max(now, self.next_slot) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+
+class AsyncFetcher:
+    def __init__(
+        self,
+        per_host_concurrency=8,
+        per_host_rate=10.0,
+        max_connections=64,
+        retries=4,
+        backoff=0.5,
+        max_backoff=30.0,
+        timeout=25,
+    ):
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = None
+        self.limiters = {}
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host_concurrency,
+                keepalive_timeout=30,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def limiter(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(
+                self.per_host_concurrency, self.per_host_rate
+            )
+        return self.limiters[host]
+
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    async def fetch(self, url, headers=None):
+        for attempt in range(self.retries + 1):
+            async with self.limiter(url):
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        body = await response.read()
+                        if (
+                            response.status not in RETRY_STATUSES
+                            or attempt == self.retries
+                        ):
+                            return FetchResponse(
+                                str(response.url),
+                                response.status,
+                                response.headers,
+                                body,
+                            )
+                        delay = self.backoff_delay(
+                            attempt, parse_retry_after(response.headers)
+                        )
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff_delay(attempt)
+
+            await asyncio.sleep(delay)
+
+    async def download(self, url, dest_path, headers=None, chunk_size=1 << 16):
+        for attempt in range(self.retries + 1):
+            async with self.limiter(url):
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        if (
+                            response.status not in RETRY_STATUSES
+                            or attempt == self.retries
+                        ):
+                            result = FetchResponse(
+                                str(response.url),
+                                response.status,
+                                response.headers,
+                                b"",
+                            )
+                            if response.status != 200:
+                                return result
+
+                            digest = hashlib.sha256()
+                            size = 0
+                            with open(dest_path, "wb") as f:
+                                async for chunk in response.content.iter_chunked(
+                                    chunk_size
+                                ):
+                                    digest.update(chunk)
+                                    f.write(chunk)
+                                    size += len(chunk)
+
+                            result.digest = digest.hexdigest()
+                            result.size = size
+                            return result
+                        delay = self.backoff_delay(
+                            attempt, parse_retry_after(response.headers)
+                        )
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff_delay(attempt)
+
+            await asyncio.sleep(delay)
+
+
+def parse_retry_after(headers):
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
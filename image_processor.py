@@ -1,24 +1,160 @@
 import os
+import time
 import base64
+import threading
+import concurrent.futures
 from dotenv import load_dotenv
 from llama_index.core.schema import ImageDocument
-from llama_index.multi_modal_llms.openai import OpenAIMultiModal
+
+import tracing
+from caption_cache import CaptionCache, image_digest
 
 load_dotenv()
 
-mm_llm = OpenAIMultiModal(model="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY"))
+CAPTION_PROMPT = "Describe shortly and clearly what is in this image. If there are metrics or charts, explain them."
 
 
-def caption_image(image_path: str) -> str:
-    with open(image_path, "rb") as f:
-        base64str = base64.b64encode(f.read()).decode("utf-8")
+class Captioner:
+    name = "base"
+
+    def caption(self, image_bytes: bytes) -> str:
+        raise NotImplementedError
+
+
+class OpenAICaptioner(Captioner):
+    def __init__(self, model="gpt-4o-mini", max_tokens=150):
+        self.name = f"openai:{model}"
+        self.model = model
+        self.max_tokens = max_tokens
+        self.mm_llm = None
+        self.lock = threading.Lock()
+
+    def llm(self):
+        with self.lock:
+            if self.mm_llm is None:
+                from llama_index.multi_modal_llms.openai import OpenAIMultiModal
+
+                self.mm_llm = OpenAIMultiModal(
+                    model=self.model, api_key=os.getenv("OPENAI_API_KEY")
+                )
+            return self.mm_llm
+
+    def caption(self, image_bytes: bytes) -> str:
+        base64str = base64.b64encode(image_bytes).decode("utf-8")
+        image_document = ImageDocument(image=base64str, image_mimetype="image")
+
+        return (
+            self.llm()
+            .complete(
+                prompt=CAPTION_PROMPT,
+                image_documents=[image_document],
+                max_tokens=self.max_tokens,
+            )
+            .text
+        )
+
+
+class StubCaptioner(Captioner):
+    name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def caption(self, image_bytes: bytes) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return f"An illustration ({len(image_bytes)} bytes, {image_digest(image_bytes)[:12]})"
+
+
+class CaptionService:
+    def __init__(self, captioner=None, cache=None, max_in_flight=8):
+        self.captioner = captioner or OpenAICaptioner()
+        self.cache = cache
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="caption"
+        )
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def caption_paths(self, image_paths):
+        image_bytes = {}
+        for path in set(image_paths):
+            with open(path, "rb") as f:
+                image_bytes[path] = f.read()
 
-    print(f"image caption for {image_path} was created")
+        digests = {path: image_digest(data) for path, data in image_bytes.items()}
+        cached = (
+            self.cache.get_many(digests.values(), self.captioner.name)
+            if self.cache is not None
+            else {}
+        )
 
-    image_document = ImageDocument(image=base64str, image_mimetype="image")
+        futures = {}
+        for path, digest in digests.items():
+            if digest not in cached and digest not in futures:
+                futures[digest] = self._submit(digest, image_bytes[path])
 
-    return mm_llm.complete(
-        prompt="Describe shortly and clearly what is in this image. If there are metrics or charts, explain them.",
-        image_documents=[image_document],
-        max_tokens=150,
-    ).text
+        captions = dict(cached)
+        for digest, future in futures.items():
+            captions[digest] = future.result()
+
+        return [captions[digests[path]] for path in image_paths]
+
+    def caption_path(self, image_path):
+        return self.caption_paths([image_path])[0]
+
+    def _submit(self, digest, image_bytes):
+        with self.lock:
+            future = self.in_flight.get(digest)
+            if future is not None:
+                return future
+            future = self.executor.submit(self._caption_miss, digest, image_bytes)
+            self.in_flight[digest] = future
+        future.add_done_callback(lambda _: self._forget(digest))
+        return future
+
+    def _forget(self, digest):
+        with self.lock:
+            self.in_flight.pop(digest, None)
+
+    def _caption_miss(self, digest, image_bytes):
+        try:
+            with tracing.trace("caption.model", captioner=self.captioner.name):
+                caption = self.captioner.caption(image_bytes)
+        except Exception as e:
+            print(f"Error captioning image {digest[:12]}: {e}")
+            return ""
+
+        if self.cache is not None:
+            self.cache.put(digest, self.captioner.name, caption)
+        print(f"image caption for {digest[:12]} was created")
+        return caption
+
+
+DEFAULT_CAPTION_CACHE = "data/caption_cache.sqlite"
+
+_caption_service = None
+_caption_service_lock = threading.Lock()
+
+
+def configure_captioning(
+    captioner=None, cache_path=DEFAULT_CAPTION_CACHE, max_in_flight=8
+):
+    global _caption_service
+    cache = CaptionCache(cache_path) if cache_path else None
+    with _caption_service_lock:
+        _caption_service = CaptionService(captioner, cache, max_in_flight)
+    return _caption_service
+
+
+def get_caption_service():
+    global _caption_service
+    with _caption_service_lock:
+        if _caption_service is None:
+            _caption_service = CaptionService(cache=CaptionCache(DEFAULT_CAPTION_CACHE))
+        return _caption_service
+
+
+def caption_image(image_path: str) -> str:
+    with tracing.span("caption.image", path=image_path):
+        return get_caption_service().caption_path(image_path)
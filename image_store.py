@@ -0,0 +1,168 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import urllib.parse
+
+
+class ImageStore:
+    def __init__(self, root="data/images"):
+        self.root = os.path.abspath(root)
+        self.blobs_dir = os.path.join(self.root, "blobs")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.conn = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite"), check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS images_digest ON images (digest)")
+        self.conn.commit()
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.blobs_dir, digest[:2], f"{digest}{ext}")
+
+    def _record(self, row):
+        if row is None:
+            return None
+        url, digest, ext, size, etag, last_modified, fetched_at = row
+        return {
+            "url": url,
+            "digest": digest,
+            "path": self.blob_path(digest, ext),
+            "filename": f"{digest}{ext}",
+            "size": size,
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "fetched_at": fetched_at,
+        }
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        return self._record(row)
+
+    def lookup_many(self, urls):
+        urls = list(set(urls))
+        records = {}
+
+        with self.lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self.conn.execute(
+                    f"SELECT * FROM images WHERE url IN ({placeholders})", chunk
+                ).fetchall()
+                for row in rows:
+                    records[row[0]] = self._record(row)
+
+        return records
+
+    def urls_for_digest(self, digest):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url FROM images WHERE digest = ?", (digest,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def is_valid(self, record):
+        try:
+            return os.path.getsize(record["path"]) == record["size"]
+        except OSError:
+            return False
+
+    def put(self, url, tmp_path, digest, size, etag="", last_modified=""):
+        ext = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+        final_path = self.blob_path(digest, ext)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, ext, size, etag, last_modified, time.time()),
+            )
+            self.conn.commit()
+
+        return self.lookup(url)
+
+    async def fetch(self, fetcher, url, revalidate=True):
+        task = self.in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(fetcher, url, revalidate))
+            self.in_flight[url] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, fetcher, url, revalidate):
+        record = self.lookup(url)
+        headers = {}
+
+        if record and self.is_valid(record):
+            if not revalidate:
+                return record
+            if record["etag"]:
+                headers["If-None-Match"] = record["etag"]
+            if record["last_modified"]:
+                headers["If-Modified-Since"] = record["last_modified"]
+            if not headers:
+                return record
+
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            response = await fetcher.download(url, tmp_path, headers=headers)
+            if response.status == 304 and record:
+                return record
+            response.raise_for_status()
+
+            return self.put(
+                url,
+                tmp_path,
+                response.digest,
+                response.size,
+                response.headers.get("ETag", ""),
+                response.headers.get("Last-Modified", ""),
+            )
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_image_store(root="data/images"):
+    root = os.path.abspath(root)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ImageStore(root)
+        return _stores[root]
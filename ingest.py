@@ -0,0 +1,489 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from dotenv import load_dotenv
+
+BATCH_URL_TEMPLATE = "https://www.deeplearning.ai/the-batch/issue-{}/"
+ROMAN_NUMERALS = [
+    (1000, "m"),
+    (900, "cm"),
+    (500, "d"),
+    (400, "cd"),
+    (100, "c"),
+    (90, "xc"),
+    (50, "l"),
+    (40, "xl"),
+    (10, "x"),
+    (9, "ix"),
+    (5, "v"),
+    (4, "iv"),
+    (1, "i"),
+]
+
+
+def to_roman(number):
+    digits = []
+    for value, numeral in ROMAN_NUMERALS:
+        while number >= value:
+            digits.append(numeral)
+            number -= value
+    return "".join(digits)
+
+
+def from_roman(numeral):
+    numeral = numeral.lower()
+    total = 0
+    for value, symbol in ROMAN_NUMERALS:
+        while numeral.startswith(symbol):
+            total += value
+            numeral = numeral[len(symbol) :]
+    if numeral:
+        raise ValueError(f"Not a roman numeral: {numeral}")
+    return total
+
+
+def parse_issue_range(spec):
+    start, _, end = spec.partition("-")
+    end = end or start
+
+    if start.isdigit() and end.isdigit():
+        slugs = [str(i) for i in range(int(start), int(end) + 1)]
+    elif re.fullmatch(r"[ivxlcdm]+", start + end, re.IGNORECASE):
+        slugs = [to_roman(i) for i in range(from_roman(start), from_roman(end) + 1)]
+    else:
+        raise argparse.ArgumentTypeError(f"Invalid issue range: {spec}")
+
+    return [BATCH_URL_TEMPLATE.format(slug) for slug in slugs]
+
+
+def read_url_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def make_shards(urls, shard_size):
+    shards = []
+    for start in range(0, len(urls), shard_size):
+        shard_urls = urls[start : start + shard_size]
+        digest = hashlib.sha1("\n".join(shard_urls).encode("utf-8")).hexdigest()
+        shards.append({"id": digest[:16], "urls": shard_urls})
+    return shards
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"shards": {}}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read checkpoint {path}: {e}")
+        return {"shards": {}}
+
+
+def save_checkpoint(checkpoint, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class PageCollector:
+    def __init__(self):
+        self.pages = []
+
+    def put_page(self, url, html, etag="", last_modified=""):
+        self.pages.append((url, html, etag, last_modified))
+
+
+_worker_options = {}
+
+
+def init_worker(options):
+    load_dotenv()
+    _worker_options.update(options)
+
+    from dedup import configure_dedup
+    from vector_store import load_embed_model
+
+    configure_dedup(options["dedup_threshold"], options["db_path"])
+    if options.get("captioner") == "stub":
+        from image_processor import StubCaptioner, configure_captioning
+
+        configure_captioning(StubCaptioner())
+    load_embed_model()
+
+
+def process_shard(shard, manifest):
+    from fetcher import AsyncFetcher
+    from manifest import diff_result
+    from scrapper import scrape_with_selector_parallel, CSS_SELECTOR
+    from chapter_store import chapter_record
+    from vector_store import (
+        caption_chapters,
+        build_document,
+        embed_documents,
+        drop_duplicates,
+        forget_duplicates,
+    )
+
+    options = _worker_options
+    collector = PageCollector()
+    start = time.perf_counter()
+
+    results = scrape_with_selector_parallel(
+        shard["urls"],
+        CSS_SELECTOR,
+        options["images_dir"],
+        max_workers=options["max_workers"],
+        manifest=manifest,
+        archive=collector,
+        fetcher_factory=partial(
+            AsyncFetcher,
+            per_host_concurrency=options["per_host_concurrency"],
+            per_host_rate=options["per_host_rate"],
+        ),
+    )
+
+    updates = []
+    chapters = []
+    errors = []
+    for result in results:
+        if result["status"] == "error":
+            errors.append(result["url"])
+        if result["status"] != "success":
+            continue
+
+        changed, stale_ids, chapter_hashes = diff_result(manifest, result)
+        summary = {key: value for key, value in result.items() if key != "chapters"}
+        updates.append((summary, stale_ids, chapter_hashes))
+        chapters.extend(changed)
+
+    orphans = forget_duplicates(
+        [chapter_id for _, stale_ids, _ in updates for chapter_id in stale_ids]
+    )
+    chapters = drop_duplicates(chapters)
+    documents = [build_document(chapter) for chapter in caption_chapters(chapters)]
+    cache_writes = []
+    nodes = embed_documents(
+        documents, cache_writes=cache_writes, layout=options["layout"]
+    )
+
+    return {
+        "id": shard["id"],
+        "urls": shard["urls"],
+        "pages": collector.pages,
+        "updates": updates,
+        "orphans": orphans,
+        "errors": errors,
+        "chapters": len(documents),
+        "chapter_records": [chapter_record(document) for document in documents],
+        "nodes": nodes,
+        "cache_writes": cache_writes,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class ShardWriter:
+    def __init__(
+        self,
+        vector_store,
+        manifest,
+        manifest_path,
+        checkpoint,
+        checkpoint_path,
+        chapter_store,
+        archive=None,
+        insert_batch=256,
+    ):
+        from embedding_cache import get_model_cache
+        from llama_index.core import Settings
+
+        self.embedding_cache = get_model_cache(Settings.embed_model)
+        self.chapter_store = chapter_store
+        self.vector_store = vector_store
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.checkpoint = checkpoint
+        self.checkpoint_path = checkpoint_path
+        self.archive = archive
+        self.insert_batch = insert_batch
+        self.buffer = []
+        self.waiting = []
+        self.failed = {}
+        self.inserted = 0
+
+    def add(self, shard_result):
+        from vector_store import delete_chapters
+
+        if self.archive is not None:
+            for url, html, etag, last_modified in shard_result["pages"]:
+                self.archive.put_page(url, html, etag, last_modified)
+
+        for hashes, vectors in shard_result["cache_writes"]:
+            self.embedding_cache.put_many(hashes, vectors)
+
+        for summary, stale_ids, chapter_hashes in shard_result["updates"]:
+            delete_chapters(self.vector_store, stale_ids, dedup=False)
+        self.chapter_store.put_many(shard_result["chapter_records"])
+
+        self.buffer.extend(shard_result["nodes"])
+        self.waiting.append(shard_result)
+        if len(self.buffer) >= self.insert_batch:
+            self.flush()
+
+    def flush(self):
+        from manifest import forget_chapters, record_result, save_manifest
+        from vector_store import insert_nodes
+
+        for start in range(0, len(self.buffer), self.insert_batch):
+            self.inserted += insert_nodes(
+                self.vector_store, self.buffer[start : start + self.insert_batch]
+            )
+        self.buffer = []
+
+        for shard_result in self.waiting:
+            for summary, stale_ids, chapter_hashes in shard_result["updates"]:
+                record_result(self.manifest, summary, chapter_hashes)
+            forget_chapters(self.manifest, shard_result["orphans"])
+            if shard_result["errors"]:
+                self.failed[shard_result["id"]] = shard_result["errors"]
+                continue
+            self.checkpoint["shards"][shard_result["id"]] = {
+                "urls": len(shard_result["urls"]),
+                "chapters": shard_result["chapters"],
+                "completed_at": time.time(),
+            }
+        self.waiting = []
+
+        save_manifest(self.manifest, self.manifest_path)
+        save_checkpoint(self.checkpoint, self.checkpoint_path)
+
+
+def run_backfill(
+    urls,
+    db_path="data/chroma_db",
+    backend=None,
+    images_dir="data/images",
+    archive_dir="data/archive",
+    manifest_path=None,
+    checkpoint_path="data/ingest_checkpoint.json",
+    shard_size=10,
+    workers=None,
+    max_workers=10,
+    insert_batch=256,
+    captioner="openai",
+    dedup_threshold=None,
+    layout=None,
+    hot_days=None,
+    per_host_rate=10.0,
+    per_host_concurrency=8,
+    initializer=init_worker,
+):
+    from archive import PageArchive
+    from chapter_store import configure_chapter_store
+    from dedup import DEDUP_THRESHOLD, configure_dedup
+    from manifest import load_db_manifest, manifest_path as db_manifest_path
+    from vector_store import setup_chromadb, bump_collection_version, CHUNK_LAYOUT
+
+    urls = list(dict.fromkeys(urls))
+    checkpoint = load_checkpoint(checkpoint_path)
+    all_shards = make_shards(urls, shard_size)
+    shards = [shard for shard in all_shards if shard["id"] not in checkpoint["shards"]]
+    print(
+        f"{len(urls)} URLs in {len(all_shards)} shards, "
+        f"{len(all_shards) - len(shards)} already done, {len(shards)} to process"
+    )
+    if not shards:
+        return checkpoint
+
+    vector_store, _, collection = setup_chromadb(
+        db_path, backend=backend, hot_days=hot_days
+    )
+    manifest_path = manifest_path or db_manifest_path(db_path)
+    manifest = load_db_manifest(manifest_path, collection.count())
+    writer = ShardWriter(
+        vector_store,
+        manifest,
+        manifest_path,
+        checkpoint,
+        checkpoint_path,
+        configure_chapter_store(db_path),
+        archive=PageArchive(archive_dir) if archive_dir else None,
+        insert_batch=insert_batch,
+    )
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    options = {
+        "images_dir": os.path.abspath(images_dir),
+        "db_path": os.path.abspath(db_path),
+        "max_workers": max_workers,
+        "captioner": captioner,
+        "dedup_threshold": (
+            DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+        ),
+        "layout": layout or CHUNK_LAYOUT,
+        "per_host_rate": per_host_rate / workers,
+        "per_host_concurrency": max(1, per_host_concurrency // workers),
+    }
+    configure_dedup(options["dedup_threshold"], db_path)
+    start = time.perf_counter()
+    done = 0
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer,
+            initargs=(options,),
+        ) as pool:
+            queued = iter(shards)
+            running = set()
+
+            def submit_next():
+                shard = next(queued, None)
+                if shard is None:
+                    return False
+                shard_manifest = {
+                    url: manifest[url] for url in shard["urls"] if url in manifest
+                }
+                running.add(pool.submit(process_shard, shard, shard_manifest))
+                return True
+
+            for _ in range(workers * 2):
+                if not submit_next():
+                    break
+
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.discard(future)
+                    shard_result = future.result()
+                    writer.add(shard_result)
+                    done += 1
+                    print(
+                        f"Shard {shard_result['id']} ({done}/{len(shards)}): "
+                        f"{shard_result['chapters']} chapters, "
+                        f"{len(shard_result['errors'])} errors, "
+                        f"{shard_result['seconds']:.1f}s"
+                    )
+                    submit_next()
+    finally:
+        writer.flush()
+        if hasattr(vector_store, "rollover"):
+            vector_store.rollover()
+        bump_collection_version(db_path)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Backfill finished: {done} shards, {writer.inserted} chunks inserted "
+        f"in {elapsed:.1f}s"
+    )
+    if writer.failed:
+        failed_urls = sum(len(errors) for errors in writer.failed.values())
+        print(
+            f"{len(writer.failed)} shards had {failed_urls} failed URLs and were "
+            "not checkpointed; run again to retry them"
+        )
+    return checkpoint
+
+
+if __name__ == "__main__":
+    from dedup import DEDUP_THRESHOLD
+    from vector_store import VECTOR_BACKEND, CHUNK_LAYOUT, LAYOUTS, TIER_HOT_DAYS
+
+    parser = argparse.ArgumentParser(
+        description="Sharded, resumable backfill of The Batch issues"
+    )
+    parser.add_argument(
+        "--issues",
+        action="append",
+        default=[],
+        metavar="RANGE",
+        help="Issue range such as 200-301 or i-xvi (repeatable)",
+    )
+    parser.add_argument(
+        "--urls-file", action="append", default=[], help="File with one URL per line"
+    )
+    parser.add_argument("urls", nargs="*", help="Extra URLs to ingest")
+    parser.add_argument("--db-path", default="data/chroma_db")
+    parser.add_argument(
+        "--backend", default=VECTOR_BACKEND, choices=["chroma", "numpy"]
+    )
+    parser.add_argument("--images-dir", default="data/images")
+    parser.add_argument("--archive-dir", default="data/archive")
+    parser.add_argument(
+        "--manifest-path", default=None, help="Defaults to <db-path>/manifest.json"
+    )
+    parser.add_argument("--checkpoint", default="data/ingest_checkpoint.json")
+    parser.add_argument("--shard-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-workers", type=int, default=10)
+    parser.add_argument("--insert-batch", type=int, default=256)
+    parser.add_argument(
+        "--per-host-rate",
+        type=float,
+        default=10.0,
+        help="Requests per second per host, shared by all workers",
+    )
+    parser.add_argument(
+        "--per-host-concurrency",
+        type=int,
+        default=8,
+        help="Concurrent requests per host, shared by all workers",
+    )
+    parser.add_argument("--captioner", default="openai", choices=["openai", "stub"])
+    parser.add_argument("--layout", default=CHUNK_LAYOUT, choices=LAYOUTS)
+    parser.add_argument(
+        "--hot-days",
+        type=int,
+        default=TIER_HOT_DAYS,
+        help="Days kept in the hot tier (0 keeps a single collection)",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help="MinHash similarity above which chapters are skipped (0 disables)",
+    )
+    args = parser.parse_args()
+
+    urls = [url for spec in args.issues for url in parse_issue_range(spec)]
+    for path in args.urls_file:
+        urls += read_url_file(path)
+    urls += args.urls
+    if not urls:
+        parser.error("Give at least one --issues range, --urls-file or URL")
+
+    try:
+        run_backfill(
+            urls,
+            db_path=args.db_path,
+            backend=args.backend,
+            images_dir=args.images_dir,
+            archive_dir=args.archive_dir,
+            manifest_path=args.manifest_path,
+            checkpoint_path=args.checkpoint,
+            shard_size=args.shard_size,
+            workers=args.workers,
+            max_workers=args.max_workers,
+            insert_batch=args.insert_batch,
+            captioner=args.captioner,
+            dedup_threshold=args.dedup_threshold,
+            layout=args.layout,
+            hot_days=args.hot_days,
+            per_host_rate=args.per_host_rate,
+            per_host_concurrency=args.per_host_concurrency,
+        )
+    except ValueError as e:
+        parser.error(str(e))
@@ -1,30 +1,69 @@
 import os
+import threading
 import streamlit as st
-from vector_store import get_existing_index
-from chat_engine import RAGEngine
-import requests
-from io import BytesIO
-from PIL import Image
+
+import tracing
+from thumbnails import get_thumbnail_cache
 
 st.set_page_config(page_title="AI News Chat", page_icon="🤖", layout="wide")
 
 
-def initialize_session_state():
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+DB_PATH = os.path.abspath("data/chroma_db")
 
-    if "chat_engine" not in st.session_state:
-        db_path = os.path.abspath("data/chroma_db")
 
-        if not os.path.exists(db_path):
-            st.error(f"Database directory not found at: {db_path}")
-            st.stop()
+@st.cache_resource(show_spinner=False)
+def start_engine_warmup(db_path: str) -> threading.Thread:
+    def warm_up():
+        from chat_engine import get_shared_engine
 
         try:
-            st.session_state.chat_engine = RAGEngine(db_path=db_path)
+            get_shared_engine(db_path)
         except Exception as e:
-            st.error(f"Failed to initialize the chat engine: {str(e)}")
-            st.stop()
+            print(f"Chat engine warm-up failed: {e}")
+
+    thread = threading.Thread(target=warm_up, name="engine-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_chat_engine():
+    from chat_engine import get_shared_engine
+
+    try:
+        with st.spinner("Loading the search index..."):
+            return get_shared_engine(DB_PATH)
+    except Exception as e:
+        st.error(f"Failed to initialize the chat engine: {str(e)}")
+        st.stop()
+
+
+def display_engine_status():
+    from chat_engine import engine_status
+
+    status = engine_status(DB_PATH)
+    with st.sidebar:
+        if status["ready"]:
+            st.success(f"Engine ready (warm-up {status['warmup_seconds']:.1f}s)")
+            cache = status["answer_cache"]
+            st.caption(
+                f"Answer cache: {cache['exact_hits']} exact / "
+                f"{cache['semantic_hits']} semantic hits, {cache['misses']} misses"
+            )
+        elif status["state"] == "failed":
+            st.error(f"Engine failed to start: {status['error']}")
+        else:
+            st.info("Engine is warming up...")
+
+
+def initialize_session_state():
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+
+    if not os.path.exists(DB_PATH):
+        st.error(f"Database directory not found at: {DB_PATH}")
+        st.stop()
+
+    start_engine_warmup(DB_PATH)
 
 
 def display_chat_messages():
@@ -36,10 +75,10 @@ def display_chat_messages():
                     st.markdown(message["sources"])
 
 
-def display_image(url: str, caption: str = None, score: float = None):
+def display_image(image_future, url: str, caption: str = None, score: float = None):
     try:
-        response = requests.get(url, timeout=10)
-        image = Image.open(BytesIO(response.content))
+        with tracing.span("render.image_wait"):
+            image = image_future.result()
         caption_text = f"{caption}\n(Relevance: {score:.2f})" if score else caption
         st.image(image, caption=caption_text, use_column_width=True)
     except Exception as e:
@@ -57,6 +96,9 @@ def format_sources_with_images(sources: list) -> tuple[str, list]:
         source_text = f"### [{source['title']}]({source['url']})\n"
         source_text += f"**Date**: {source['date']}\n"
         source_text += f"**Relevance Score**: {source['score']:.2f}\n"
+        if source.get("covered_urls"):
+            links = ", ".join(f"[{url}]({url})" for url in source["covered_urls"])
+            source_text += f"**Also appeared in**: {links}\n"
 
         if source["images"]:
             source_text += "\n**Related Images**:\n"
@@ -65,6 +107,7 @@ def format_sources_with_images(sources: list) -> tuple[str, list]:
                 img_data = {
                     "url": img["url"],
                     "caption": img["caption"],
+                    "path": img.get("path", ""),
                     "score": img["score"],
                     "source_title": source["title"],
                     "source_date": source["date"],
@@ -78,6 +121,92 @@ def format_sources_with_images(sources: list) -> tuple[str, list]:
     return "\n".join(formatted), relevant_images
 
 
+def display_images(relevant_images: list, image_futures: list):
+    if not relevant_images:
+        return
+
+    st.write("### Related Visualizations")
+    cols = st.columns(min(2, len(relevant_images)))
+    for idx, (img, future) in enumerate(zip(relevant_images, image_futures)):
+        with cols[idx % 2], tracing.span("render.image"):
+            caption = (
+                f"{img['caption']}\nFrom: {img['source_title']} ({img['source_date']})"
+            )
+            display_image(future, img["url"], caption, img["score"])
+
+
+def submit_thumbnails(relevant_images: list) -> list:
+    thumbnails = get_thumbnail_cache()
+    return [thumbnails.submit(img["path"], img["url"]) for img in relevant_images]
+
+
+def run_search(prompt: str):
+    with tracing.trace("ui.search"):
+        render_search(prompt)
+
+
+def render_search(prompt: str):
+    sources = get_chat_engine().search(prompt)
+    if not sources:
+        st.markdown("No matching articles found.")
+        st.session_state.messages.append(
+            {"role": "assistant", "content": "No matching articles found."}
+        )
+        return
+
+    with tracing.span("render.sources"):
+        formatted_sources, relevant_images = format_sources_with_images(sources)
+        image_futures = submit_thumbnails(relevant_images)
+        st.markdown(formatted_sources)
+    display_images(relevant_images, image_futures)
+    st.session_state.messages.append(
+        {
+            "role": "assistant",
+            "content": formatted_sources,
+            "images": relevant_images,
+        }
+    )
+
+
+def run_query(prompt: str):
+    with tracing.trace("ui.query"):
+        render_answer(prompt)
+
+
+def render_answer(prompt: str):
+    with st.spinner("Searching..."), tracing.span("render.first_sources"):
+        events = get_chat_engine().query_stream(
+            prompt, chat_history=st.session_state.messages
+        )
+        sources = next(events)["sources"]
+
+    with tracing.span("render.sources"):
+        formatted_sources, relevant_images = format_sources_with_images(sources)
+        image_futures = submit_thumbnails(relevant_images)
+
+    with tracing.span("render.stream"):
+        response = st.write_stream(
+            event["text"] for event in events if event["type"] == "token"
+        )
+
+    display_images(relevant_images, image_futures)
+
+    if sources:
+        with st.expander("View Sources"):
+            st.markdown(formatted_sources)
+
+        st.session_state.messages.append(
+            {
+                "role": "assistant",
+                "content": response,
+                "sources": formatted_sources,
+                "images": relevant_images,
+            }
+        )
+    else:
+        st.session_state.messages.append({"role": "assistant", "content": response})
+
+
 def main():
     st.title("AI News ChatBot 🤖")
     st.markdown(
@@ -88,6 +217,10 @@ def main():
     )
 
     initialize_session_state()
+    display_engine_status()
+    search_only = st.sidebar.toggle(
+        "Search only", help="Return matching articles without generating an answer"
+    )
     display_chat_messages()
 
     if prompt := st.chat_input("What would you like to know about AI?"):
@@ -96,52 +229,21 @@ def main():
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    response, sources = st.session_state.chat_engine.query(
-                        prompt, chat_history=st.session_state.messages
-                    )
-
-                    st.markdown(response)
-
-                    if sources:
-                        formatted_sources, relevant_images = format_sources_with_images(
-                            sources
-                        )
-
-                        if relevant_images:
-                            st.write("### Related Visualizations")
-                            cols = st.columns(min(2, len(relevant_images)))
-                            for idx, img in enumerate(relevant_images):
-                                with cols[idx % 2]:
-                                    caption = f"{img['caption']}\nFrom: {img['source_title']} ({img['source_date']})"
-                                    display_image(img["url"], caption, img["score"])
-
-                        with st.expander("View Sources"):
-                            st.markdown(formatted_sources)
-
-                        st.session_state.messages.append(
-                            {
-                                "role": "assistant",
-                                "content": response,
-                                "sources": formatted_sources,
-                                "images": relevant_images,
-                            }
-                        )
-                    else:
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": response}
-                        )
-
-                except Exception as e:
-                    error_msg = f"Error generating response: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.messages.append(
-                        {
-                            "role": "assistant",
-                            "content": "I apologize, but I encountered an error while processing your question. Please try again.",
-                        }
-                    )
+            try:
+                if search_only:
+                    run_search(prompt)
+                else:
+                    run_query(prompt)
+
+            except Exception as e:
+                error_msg = f"Error generating response: {str(e)}"
+                st.error(error_msg)
+                st.session_state.messages.append(
+                    {
+                        "role": "assistant",
+                        "content": "I apologize, but I encountered an error while processing your question. Please try again.",
+                    }
+                )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+
+
+def manifest_path(db_path="data/chroma_db"):
+    return os.path.join(db_path, "manifest.json")
+
+
+def load_manifest(path=None):
+    path = path or manifest_path()
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read manifest {path}: {e}")
+        return {}
+
+
+def load_db_manifest(path, document_count):
+    if document_count and not os.path.exists(path):
+        raise ValueError(
+            f"The index holds {document_count} documents but has no manifest at "
+            f"{path}, so an incremental refresh would insert every chapter again. "
+            "Move the manifest it was built with there, or rebuild the index with "
+            "`python scrapper.py rebuild-from-archive`."
+        )
+    return load_manifest(path)
+
+
+def save_manifest(manifest, path=None):
+    path = path or manifest_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def conditional_headers(manifest, url):
+    entry = manifest.get(url)
+    if not entry:
+        return {}
+
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def chapter_hash(chapter):
+    digest = hashlib.sha256()
+    digest.update(chapter["title"].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chapter["content"].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chapter.get("published_date", "").encode("utf-8"))
+    for img in chapter.get("images", []):
+        digest.update(b"\0")
+        digest.update(img["url"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def diff_result(manifest, result):
+    previous = manifest.get(result["url"], {}).get("chapters", {})
+    current = {chapter["id"]: chapter_hash(chapter) for chapter in result["chapters"]}
+
+    changed = [
+        chapter
+        for chapter in result["chapters"]
+        if previous.get(chapter["id"]) != current[chapter["id"]]
+    ]
+    stale_ids = [
+        chapter_id
+        for chapter_id in previous
+        if chapter_id not in current or previous[chapter_id] != current[chapter_id]
+    ]
+
+    return changed, stale_ids, current
+
+
+def record_result(manifest, result, chapter_hashes):
+    manifest[result["url"]] = {
+        "etag": result.get("etag", ""),
+        "last_modified": result.get("last_modified", ""),
+        "article_id": result.get("article_id", ""),
+        "chapters": chapter_hashes,
+    }
+
+
+def forget_chapters(manifest, chapters):
+    for chapter_id, url in chapters:
+        entry = manifest.get(url)
+        if not entry:
+            continue
+        entry["chapters"].pop(chapter_id, None)
+        entry["etag"] = ""
+        entry["last_modified"] = ""
@@ -0,0 +1,573 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+SCORE_CHUNK_ROWS = 1 << 14
+COMPACT_DEAD_FRACTION = 0.25
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def grown_npy_header(path, rows):
+    with open(path, "rb") as f:
+        if np.lib.format.read_magic(f) != (1, 0):
+            return None
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        data_start = f.tell()
+
+    if fortran_order or dtype != rows.dtype or shape[1:] != rows.shape[1:]:
+        return None
+
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (shape[0] + len(rows),) + shape[1:],
+        }
+    )
+    header_len = data_start - 10
+    if len(header) + 1 > header_len:
+        return None
+    return (header.ljust(header_len - 1) + "\n").encode("latin1")
+
+
+def dequantized(matrix, scales, start, stop):
+    chunk = np.asarray(matrix[start:stop], dtype=np.float32)
+    if scales is not None:
+        chunk *= scales[start:stop, None]
+    return chunk
+
+
+def append_npy(path, rows, header):
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(rows).tobytes())
+        f.seek(10)
+        f.write(header)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    persist_dir: str
+    quantization: str = "float32"
+    similarity: str = "l2"
+    auto_persist: bool = True
+
+    _lock: Any = PrivateAttr()
+    _conn: Any = PrivateAttr()
+    _matrix: Any = PrivateAttr(default=None)
+    _scales: Any = PrivateAttr(default=None)
+    _pending: Any = PrivateAttr(default_factory=list)
+    _live: Any = PrivateAttr(default=None)
+    _columns: Any = PrivateAttr(default=None)
+    _generation: Any = PrivateAttr(default=0)
+
+    def __init__(
+        self,
+        persist_dir: str,
+        quantization: str = "float32",
+        similarity: str = "l2",
+        auto_persist: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+        super().__init__(
+            persist_dir=persist_dir,
+            quantization=quantization,
+            similarity=similarity,
+            auto_persist=auto_persist,
+            **kwargs,
+        )
+        os.makedirs(persist_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            os.path.join(persist_dir, "nodes.sqlite"), check_same_thread=False
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                row INTEGER PRIMARY KEY,
+                node_id TEXT UNIQUE NOT NULL,
+                ref_doc_id TEXT,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS nodes_ref ON nodes (ref_doc_id)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS nodes_dead ON nodes (row) WHERE payload = ''"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._conn.commit()
+        self._generation = self._stored_generation()
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def matrix_path(self):
+        return os.path.join(self.persist_dir, "embeddings.npy")
+
+    @property
+    def scales_path(self):
+        return os.path.join(self.persist_dir, "scales.npy")
+
+    def _load(self):
+        if os.path.exists(self.matrix_path):
+            self._matrix = np.load(self.matrix_path, mmap_mode="r")
+            if self.quantization == "int8" and os.path.exists(self.scales_path):
+                self._scales = np.load(self.scales_path)
+        else:
+            self._matrix = None
+            self._scales = None
+
+        self._live = np.ones(self._stored_rows(), dtype=bool)
+        self._flush_pending_deletes()
+        self._columns = None
+
+    def _stored_generation(self):
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _bump_generation(self):
+        self._conn.execute(
+            "INSERT INTO meta VALUES ('generation', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+        self._generation = self._stored_generation()
+
+    def _refresh(self):
+        generation = self._stored_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self._load()
+
+    def _stored_rows(self):
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM nodes) - "
+                "(SELECT COUNT(*) FROM nodes WHERE payload = '')"
+            ).fetchone()[0]
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        with self._lock:
+            self._refresh()
+            first_row = self._stored_rows() + len(self._pending)
+            rows = []
+            for offset, node in enumerate(nodes):
+                payload = node_to_metadata_dict(
+                    node, remove_text=False, flat_metadata=False
+                )
+                rows.append(
+                    (
+                        first_row + offset,
+                        node.node_id,
+                        node.ref_doc_id,
+                        json.dumps(payload),
+                    )
+                )
+                self._pending.append(node.get_embedding())
+
+            self._conn.execute(
+                "UPDATE nodes SET payload = '', node_id = 'deleted:' || row "
+                f"WHERE node_id IN ({','.join('?' for _ in nodes)})",
+                [node.node_id for node in nodes],
+            )
+            self._flush_pending_deletes()
+            self._conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?)", rows)
+            self._bump_generation()
+            self._conn.commit()
+            self._columns = None
+
+            if self.auto_persist:
+                self.persist()
+
+        return [node.node_id for node in nodes]
+
+    def _flush_pending_deletes(self):
+        for (row,) in self._conn.execute(
+            "SELECT row FROM nodes WHERE payload = ''"
+        ).fetchall():
+            if row < len(self._live):
+                self._live[row] = False
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE nodes SET payload = '', node_id = 'deleted:' || row "
+                "WHERE ref_doc_id = ?",
+                (ref_doc_id,),
+            )
+            self._bump_generation()
+            self._conn.commit()
+            self._flush_pending_deletes()
+            self._columns = None
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        if filters is not None:
+            node_ids = [node.node_id for node in self.get_nodes(node_ids, filters)]
+        node_ids = list(node_ids or [])
+
+        with self._lock:
+            for start in range(0, len(node_ids), 500):
+                chunk = node_ids[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                self._conn.execute(
+                    f"UPDATE nodes SET payload = '', node_id = 'deleted:' || row "
+                    f"WHERE node_id IN ({placeholders})",
+                    chunk,
+                )
+            self._bump_generation()
+            self._conn.commit()
+            self._flush_pending_deletes()
+            self._columns = None
+
+    def get_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+    ) -> List[BaseNode]:
+        with self._lock:
+            self._refresh()
+            if self._pending:
+                self.persist()
+            if self._matrix is None:
+                return []
+
+            mask = self._live.copy()
+            if filters is not None:
+                mask &= self._filter_mask(filters)
+            if node_ids:
+                mask &= self._node_id_mask(node_ids)
+            rows = [int(row) for row in np.flatnonzero(mask)]
+
+            nodes = []
+            for start in range(0, len(rows), 500):
+                chunk = rows[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                payloads = dict(
+                    self._conn.execute(
+                        f"SELECT row, payload FROM nodes WHERE row IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+                vectors = np.asarray(self._matrix[chunk], dtype=np.float32)
+                if self._scales is not None:
+                    vectors *= self._scales[chunk, None]
+                for row, vector in zip(chunk, vectors):
+                    if not payloads.get(row):
+                        continue
+                    node = metadata_dict_to_node(json.loads(payloads[row]))
+                    node.embedding = vector.tolist()
+                    nodes.append(node)
+
+        return nodes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM nodes")
+            self._bump_generation()
+            self._conn.commit()
+            self._pending = []
+            for path in (self.matrix_path, self.scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+
+    def _quantize(self, matrix):
+        if self.quantization == "float16":
+            return matrix.astype(np.float16), None
+        if self.quantization == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        return matrix.astype(np.float32), None
+
+    def persist(self, persist_path: Optional[str] = None, fs: Any = None) -> None:
+        with self._lock:
+            if self._pending and not self._append_pending():
+                self.compact()
+                return
+
+            total, dead = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM nodes), "
+                "(SELECT COUNT(*) FROM nodes WHERE payload = '')"
+            ).fetchone()
+            if dead and dead >= COMPACT_DEAD_FRACTION * total:
+                self.compact()
+
+    def _append_pending(self):
+        if self._matrix is None:
+            return False
+
+        matrix, scales = self._quantize(normalize_rows(self._pending))
+        header = grown_npy_header(self.matrix_path, matrix)
+        if header is None:
+            return False
+        if scales is not None:
+            if self._scales is None or len(self._scales) != self._stored_rows():
+                return False
+            scales_header = grown_npy_header(self.scales_path, scales)
+            if scales_header is None:
+                return False
+            append_npy(self.scales_path, scales, scales_header)
+
+        self._matrix = None
+        append_npy(self.matrix_path, matrix, header)
+        self._pending = []
+        self._bump_generation()
+        self._conn.commit()
+        self._load()
+        return True
+
+    def compact(self) -> None:
+        with self._lock:
+            stored = self._stored_rows()
+            old_rows = [
+                row
+                for (row,) in self._conn.execute(
+                    "SELECT row FROM nodes WHERE payload != '' ORDER BY row"
+                ).fetchall()
+            ]
+            if old_rows == list(range(stored)) and not self._pending:
+                return
+
+            parts = []
+            stored_rows = [row for row in old_rows if row < stored]
+            for start in range(0, len(stored_rows), SCORE_CHUNK_ROWS):
+                chunk = stored_rows[start : start + SCORE_CHUNK_ROWS]
+                parts.append(
+                    dequantized(self._matrix, self._scales, chunk[0], chunk[-1] + 1)[
+                        np.asarray(chunk) - chunk[0]
+                    ]
+                )
+            pending_rows = [row - stored for row in old_rows if row >= stored]
+            if pending_rows:
+                parts.append(
+                    normalize_rows([self._pending[row] for row in pending_rows])
+                )
+
+            self._matrix = None
+            self._scales = None
+            if parts:
+                matrix, scales = self._quantize(np.concatenate(parts))
+                tmp_path = f"{self.matrix_path}.tmp.npy"
+                np.save(tmp_path, matrix)
+                os.replace(tmp_path, self.matrix_path)
+                if scales is not None:
+                    tmp_path = f"{self.scales_path}.tmp.npy"
+                    np.save(tmp_path, scales)
+                    os.replace(tmp_path, self.scales_path)
+            elif os.path.exists(self.matrix_path):
+                os.remove(self.matrix_path)
+
+            self._conn.execute("DELETE FROM nodes WHERE payload = ''")
+            self._conn.executemany(
+                "UPDATE nodes SET row = ? WHERE row = ?",
+                [
+                    (-(new_row + 1), old_row)
+                    for new_row, old_row in enumerate(old_rows)
+                    if new_row != old_row
+                ],
+            )
+            self._conn.execute("UPDATE nodes SET row = -row - 1 WHERE row < 0")
+            self._bump_generation()
+            self._conn.commit()
+
+            self._pending = []
+            self._load()
+
+    def _scores(self, query_embedding, matrix, scales):
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        rows = matrix.shape[0]
+        if self.quantization == "float32":
+            cosine = matrix @ query
+        else:
+            cosine = np.concatenate(
+                [
+                    dequantized(
+                        matrix, scales, start, min(start + SCORE_CHUNK_ROWS, rows)
+                    )
+                    @ query
+                    for start in range(0, rows, SCORE_CHUNK_ROWS)
+                ]
+            )
+
+        if self.similarity == "cosine":
+            return cosine
+        return np.exp(-(2.0 - 2.0 * cosine))
+
+    def _column(self, key):
+        if self._columns is None:
+            self._columns = {}
+        if key not in self._columns:
+            values = np.empty(self._stored_rows(), dtype=object)
+            for row, payload in self._conn.execute(
+                "SELECT row, payload FROM nodes WHERE payload != ''"
+            ).fetchall():
+                if row < len(values):
+                    values[row] = json.loads(payload).get(key)
+            self._columns[key] = values
+        return self._columns[key]
+
+    def _filter_mask(self, filters: MetadataFilters):
+        masks = []
+        for item in filters.filters:
+            if isinstance(item, MetadataFilters):
+                masks.append(self._filter_mask(item))
+                continue
+
+            column = self._column(item.key)
+            value = item.value
+            op = item.operator
+            present = np.array([v is not None for v in column], dtype=bool)
+
+            if op == FilterOperator.EQ:
+                mask = np.array([v == value for v in column], dtype=bool)
+            elif op == FilterOperator.NE:
+                mask = np.array([v != value for v in column], dtype=bool)
+            elif op == FilterOperator.IN:
+                mask = np.array([v in value for v in column], dtype=bool)
+            elif op == FilterOperator.NIN:
+                mask = np.array([v not in value for v in column], dtype=bool)
+            elif op in (
+                FilterOperator.GT,
+                FilterOperator.GTE,
+                FilterOperator.LT,
+                FilterOperator.LTE,
+            ):
+                numeric = np.array(
+                    [v if isinstance(v, (int, float)) else np.nan for v in column],
+                    dtype=np.float64,
+                )
+                with np.errstate(invalid="ignore"):
+                    mask = {
+                        FilterOperator.GT: numeric > value,
+                        FilterOperator.GTE: numeric >= value,
+                        FilterOperator.LT: numeric < value,
+                        FilterOperator.LTE: numeric <= value,
+                    }[op]
+                mask &= present
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            masks.append(mask)
+
+        if not masks:
+            return np.ones(self._stored_rows(), dtype=bool)
+        if filters.condition == FilterCondition.OR:
+            return np.logical_or.reduce(masks)
+        return np.logical_and.reduce(masks)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        while True:
+            with self._lock:
+                self._refresh()
+                if self._pending:
+                    self.persist()
+                if self._matrix is None or not self._live.any():
+                    return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+                generation = self._generation
+                matrix, scales = self._matrix, self._scales
+                mask = self._live.copy()
+                if query.filters is not None:
+                    mask &= self._filter_mask(query.filters)
+                if query.node_ids:
+                    mask &= self._node_id_mask(query.node_ids)
+
+            scores = self._scores(query.query_embedding, matrix, scales)
+            scores = np.where(mask, scores, -np.inf)
+
+            candidates = int(mask.sum())
+            top_k = min(query.similarity_top_k, candidates)
+            if top_k <= 0:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+            if top_k < len(scores):
+                top_rows = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                top_rows = np.arange(len(scores))
+            top_rows = top_rows[np.argsort(-scores[top_rows])]
+            top_rows = [int(row) for row in top_rows]
+
+            placeholders = ",".join("?" for _ in top_rows)
+            with self._lock:
+                payloads = dict(
+                    self._conn.execute(
+                        f"SELECT row, payload FROM nodes WHERE row IN ({placeholders})",
+                        top_rows,
+                    ).fetchall()
+                )
+                if self._stored_generation() == generation:
+                    break
+
+        top_rows = [row for row in top_rows if payloads.get(row)]
+        nodes = [metadata_dict_to_node(json.loads(payloads[row])) for row in top_rows]
+        return VectorStoreQueryResult(
+            nodes=nodes,
+            similarities=[float(scores[row]) for row in top_rows],
+            ids=[node.node_id for node in nodes],
+        )
+
+    def _node_id_mask(self, node_ids):
+        mask = np.zeros(self._stored_rows(), dtype=bool)
+        placeholders = ",".join("?" for _ in node_ids)
+        for (row,) in self._conn.execute(
+            f"SELECT row FROM nodes WHERE node_id IN ({placeholders})", list(node_ids)
+        ).fetchall():
+            if row < len(mask):
+                mask[row] = True
+        return mask
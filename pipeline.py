@@ -0,0 +1,241 @@
+import time
+import queue
+import threading
+
+from manifest import diff_result, forget_chapters, record_result, save_manifest
+from vector_store import (
+    caption_chapter,
+    build_document,
+    embed_documents,
+    insert_nodes,
+    drop_duplicates,
+    delete_chapters,
+    store_chapters,
+)
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, items, seconds):
+        with self.lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def summary(self, elapsed):
+        busy_rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        wall_rate = self.items / elapsed if elapsed else 0.0
+        return (
+            f"{self.name:>8}: {self.items} items, {self.busy_seconds:.1f}s busy, "
+            f"{busy_rate:.1f}/s busy, {wall_rate:.1f}/s wall"
+        )
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        vector_store,
+        manifest=None,
+        manifest_path=None,
+        batch_size=32,
+        queue_size=64,
+        caption_workers=4,
+        layout=None,
+    ):
+        self.vector_store = vector_store
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.batch_size = batch_size
+        self.caption_workers = caption_workers
+        self.layout = layout
+
+        self.chapters = queue.Queue(maxsize=queue_size)
+        self.documents = queue.Queue(maxsize=queue_size)
+        self.batches = queue.Queue(maxsize=max(1, queue_size // batch_size))
+
+        self.stats = {
+            name: StageStats(name) for name in ("scrape", "caption", "embed", "insert")
+        }
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.captioners_left = caption_workers
+        self.abort = threading.Event()
+        self.error = None
+
+    def run(self, results):
+        threads = [threading.Thread(target=self._guard(self._scrape), args=(results,))]
+        threads += [
+            threading.Thread(target=self._guard(self._caption))
+            for _ in range(self.caption_workers)
+        ]
+        threads += [
+            threading.Thread(target=self._guard(self._embed)),
+            threading.Thread(target=self._guard(self._insert)),
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        self._save_manifest()
+
+        print(f"Pipeline finished in {elapsed:.1f}s")
+        for stage in self.stats.values():
+            print(stage.summary(elapsed))
+
+        if self.error:
+            raise self.error
+        return self.stats
+
+    def _guard(self, stage):
+        def run_stage(*args):
+            try:
+                stage(*args)
+            except Exception as e:
+                print(f"Pipeline stage {stage.__name__} failed: {e}")
+                self.error = self.error or e
+                self.abort.set()
+
+        return run_stage
+
+    def _put(self, q, item):
+        while not self.abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self.abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _scrape(self, results):
+        iterator = iter(results)
+
+        while not self.abort.is_set():
+            start = time.perf_counter()
+            result = next(iterator, _DONE)
+            if result is _DONE:
+                break
+            self.stats["scrape"].add(1, time.perf_counter() - start)
+
+            if result["status"] != "success":
+                continue
+
+            if self.manifest is None:
+                changed = drop_duplicates(result["chapters"])
+            else:
+                changed, stale_ids, chapter_hashes = diff_result(self.manifest, result)
+                orphans = delete_chapters(self.vector_store, stale_ids)
+                with self.pending_lock:
+                    forget_chapters(self.manifest, orphans)
+                changed = drop_duplicates(changed)
+                self._track(result, changed, chapter_hashes)
+
+            for chapter in changed:
+                if not self._put(self.chapters, chapter):
+                    return
+
+        for _ in range(self.caption_workers):
+            self._put(self.chapters, _DONE)
+
+    def _caption(self):
+        while True:
+            chapter = self._get(self.chapters)
+            if chapter is _DONE:
+                break
+
+            start = time.perf_counter()
+            document = build_document(caption_chapter(chapter))
+            self.stats["caption"].add(1, time.perf_counter() - start)
+
+            if not self._put(self.documents, document):
+                return
+
+        with self.pending_lock:
+            self.captioners_left -= 1
+            last = self.captioners_left == 0
+        if last:
+            self._put(self.documents, _DONE)
+
+    def _embed(self):
+        batch = []
+
+        while True:
+            document = self._get(self.documents)
+            if document is not _DONE:
+                batch.append(document)
+                if len(batch) < self.batch_size:
+                    continue
+
+            if batch:
+                start = time.perf_counter()
+                store_chapters(batch)
+                nodes = embed_documents(batch, layout=self.layout)
+                self.stats["embed"].add(len(batch), time.perf_counter() - start)
+                if not self._put(self.batches, nodes):
+                    return
+                batch = []
+
+            if document is _DONE:
+                break
+
+        self._put(self.batches, _DONE)
+
+    def _insert(self):
+        while True:
+            nodes = self._get(self.batches)
+            if nodes is _DONE:
+                break
+
+            start = time.perf_counter()
+            insert_nodes(self.vector_store, nodes)
+            chapter_urls = {node.ref_doc_id: node.metadata["url"] for node in nodes}
+            self.stats["insert"].add(len(chapter_urls), time.perf_counter() - start)
+
+            for url in chapter_urls.values():
+                self._complete(url)
+            self._save_manifest()
+
+    def _track(self, result, changed, chapter_hashes):
+        summary = {key: value for key, value in result.items() if key != "chapters"}
+
+        with self.pending_lock:
+            if changed:
+                self.pending[result["url"]] = [len(changed), summary, chapter_hashes]
+                return
+            record_result(self.manifest, summary, chapter_hashes)
+
+    def _complete(self, url):
+        if self.manifest is None:
+            return
+
+        with self.pending_lock:
+            entry = self.pending.get(url)
+            if not entry:
+                return
+            entry[0] -= 1
+            if entry[0] == 0:
+                del self.pending[url]
+                record_result(self.manifest, entry[1], entry[2])
+
+    def _save_manifest(self):
+        if self.manifest is None or not self.manifest_path:
+            return
+
+        with self.pending_lock:
+            save_manifest(self.manifest, self.manifest_path)
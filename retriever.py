@@ -0,0 +1,153 @@
+import math
+import time
+import calendar
+from datetime import datetime, date
+from typing import List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+
+SECONDS_PER_DAY = 86400
+
+
+def published_ts(value):
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    if isinstance(value, date):
+        return calendar.timegm(value.timetuple())
+    try:
+        return calendar.timegm(time.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        return 0
+
+
+def node_timestamp(node):
+    metadata = node.metadata
+    if "published_ts" in metadata:
+        return metadata["published_ts"] or 0
+    return published_ts(metadata.get("published_date", ""))
+
+
+def date_filters(date_from=None, date_to=None):
+    filters = []
+    if date_from:
+        filters.append(
+            MetadataFilter(
+                key="published_ts",
+                value=published_ts(date_from),
+                operator=FilterOperator.GTE,
+            )
+        )
+    if date_to:
+        filters.append(
+            MetadataFilter(
+                key="published_ts",
+                value=published_ts(date_to) + SECONDS_PER_DAY - 1,
+                operator=FilterOperator.LTE,
+            )
+        )
+    return MetadataFilters(filters=filters) if filters else None
+
+
+def chunk_position(node):
+    _, _, position = node.node_id.rpartition("-")
+    return int(position) if position.isdigit() else 0
+
+
+def merge_parents(candidates: List[NodeWithScore]) -> List[NodeWithScore]:
+    groups = {}
+    for candidate in candidates:
+        parent_id = candidate.node.ref_doc_id or candidate.node.node_id
+        groups.setdefault(parent_id, []).append(candidate)
+
+    merged = []
+    for children in groups.values():
+        best = max(children, key=lambda child: child.score or 0.0)
+        if len(children) == 1:
+            merged.append(best)
+            continue
+
+        children.sort(key=lambda child: chunk_position(child.node))
+        node = best.node.model_copy()
+        node.set_content("\n\n".join(child.node.get_content() for child in children))
+        merged.append(NodeWithScore(node=node, score=best.score))
+
+    return merged
+
+
+class RecencyRetriever(BaseRetriever):
+    def __init__(
+        self,
+        index,
+        candidate_k: int = 10,
+        top_k: int = 3,
+        score_cutoff: float = 0.4,
+        mode: str = "weighted",
+        recency_weight: float = 0.3,
+        half_life_days: float = 180.0,
+        filters: Optional[MetadataFilters] = None,
+    ):
+        if mode not in ("weighted", "date"):
+            raise ValueError(f"Unknown recency mode: {mode}")
+        self.index = index
+        self.candidate_k = candidate_k
+        self.top_k = top_k
+        self.score_cutoff = score_cutoff
+        self.mode = mode
+        self.recency_weight = recency_weight
+        self.half_life_days = half_life_days
+        self.filters = filters
+        self.vector_retriever = index.as_retriever(
+            similarity_top_k=candidate_k, filters=filters
+        )
+        super().__init__()
+
+    def with_date_range(self, date_from=None, date_to=None):
+        return RecencyRetriever(
+            self.index,
+            candidate_k=self.candidate_k,
+            top_k=self.top_k,
+            score_cutoff=self.score_cutoff,
+            mode=self.mode,
+            recency_weight=self.recency_weight,
+            half_life_days=self.half_life_days,
+            filters=date_filters(date_from, date_to),
+        )
+
+    def rank(self, candidates: List[NodeWithScore]) -> List[NodeWithScore]:
+        scored = [
+            (node_timestamp(node), node)
+            for node in candidates
+            if node.score is not None and node.score >= self.score_cutoff
+        ]
+        if not scored:
+            return []
+
+        if self.mode == "date":
+            scored.sort(key=lambda item: item[0], reverse=True)
+            return [node for _, node in scored[: self.top_k]]
+
+        newest = max(ts for ts, _ in scored)
+        half_life = self.half_life_days * SECONDS_PER_DAY
+
+        weight = self.recency_weight
+
+        def combined(item):
+            ts, node = item
+            recency = math.pow(0.5, (newest - ts) / half_life) if ts else 0.0
+            return (1 - weight) * node.score + weight * recency
+
+        scored.sort(key=combined, reverse=True)
+        return [node for _, node in scored[: self.top_k]]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.rank(merge_parents(self.vector_retriever.retrieve(query_bundle)))
@@ -1,19 +1,38 @@
 import os
-import re
-import time
-import requests
-import datetime
+import queue
+import argparse
+import asyncio
+import threading
 import urllib.parse
-import concurrent.futures
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
-from vector_store import setup_chromadb, data_load
+import tracing
+
+from llama_index.core import VectorStoreIndex
+
+from archive import PageArchive
+from dedup import DEDUP_THRESHOLD, configure_dedup, get_dedup_index
+from extractor import extract_article
+from fetcher import AsyncFetcher
+from image_store import get_image_store
+from manifest import load_db_manifest, conditional_headers, manifest_path
+from pipeline import IngestPipeline
+from thumbnails import get_thumbnail_cache
+from chapter_store import configure_chapter_store
+from vector_store import (
+    setup_chromadb,
+    bump_collection_version,
+    migrate_chapter_store,
+    VECTOR_BACKEND,
+    CHUNK_LAYOUT,
+    TIER_HOT_DAYS,
+    LAYOUTS,
+)
 
 load_dotenv()
 
 
-def process_image(img_url, article_url, article_id, images_dir):
+def resolve_image_url(img_url, article_url):
     if not img_url:
         return None
 
@@ -28,24 +47,30 @@ def process_image(img_url, article_url, article_id, images_dir):
     ):
         return None
 
-    img_filename = re.sub(r"[^\w\-_.]", "_", f"{os.path.basename(img_url)}")
-    issue_images_dir = os.path.join(images_dir, article_id)
-    os.makedirs(issue_images_dir, exist_ok=True)
-    img_filepath = os.path.join(issue_images_dir, img_filename)
+    return img_url
 
+
+def pregenerate_thumbnail(path):
     try:
-        img_response = requests.get(img_url, timeout=10)
-        img_response.raise_for_status()
+        get_thumbnail_cache().from_path(path)
+    except Exception as e:
+        print(f"Error creating thumbnail for {path}: {e}")
 
-        with open(img_filepath, "wb") as img_file:
-            img_file.write(img_response.content)
 
-        # caption = caption_image(img_filepath)
+async def process_image(fetcher, img_url, article_url, images_dir):
+    img_url = resolve_image_url(img_url, article_url)
+    if not img_url:
+        return None
+
+    try:
+        record = await get_image_store(images_dir).fetch(fetcher, img_url)
+        await asyncio.to_thread(pregenerate_thumbnail, record["path"])
 
         return {
             "url": img_url,
-            "filename": img_filename,
-            "path": os.path.abspath(img_filepath),
+            "filename": record["filename"],
+            "path": record["path"],
+            "digest": record["digest"],
             "caption": "",
         }
     except Exception as e:
@@ -53,185 +78,413 @@ def process_image(img_url, article_url, article_id, images_dir):
         return None
 
 
-def process_url(url, selector, images_dir):
+def parse_article(html, url, selector):
+    return extract_article(html, url, selector)
+
+
+async def attach_images(fetcher, result, images_dir):
+    async def load_chapter_images(chapter):
+        images = await asyncio.gather(
+            *(
+                process_image(fetcher, src, result["url"], images_dir)
+                for src in chapter.pop("image_srcs")
+            )
+        )
+        chapter["images"] = [img for img in images if img]
+
+    await asyncio.gather(
+        *(load_chapter_images(chapter) for chapter in result["chapters"])
+    )
+    result["chapters"] = [
+        chapter
+        for chapter in result["chapters"]
+        if chapter["content"] or chapter["images"]
+    ]
+    return result
+
+
+def attach_local_images(result, images_dir):
+    records = get_image_store(images_dir).lookup_many(
+        resolve_image_url(src, result["url"])
+        for chapter in result["chapters"]
+        for src in chapter["image_srcs"]
+    )
+
+    for chapter in result["chapters"]:
+        chapter["images"] = []
+        for src in chapter.pop("image_srcs"):
+            record = records.get(resolve_image_url(src, result["url"]))
+            if record and os.path.exists(record["path"]):
+                chapter["images"].append(
+                    {
+                        "url": record["url"],
+                        "filename": record["filename"],
+                        "path": record["path"],
+                        "digest": record["digest"],
+                        "caption": "",
+                    }
+                )
+
+    result["chapters"] = [
+        chapter
+        for chapter in result["chapters"]
+        if chapter["content"] or chapter["images"]
+    ]
+    return result
+
+
+def parse_archived_page(page, selector, images_dir):
     try:
-        response = requests.get(url, timeout=25)
-        response.raise_for_status()
+        result = parse_article(page["html"], page["url"], selector)
+        if result["status"] != "success":
+            return result
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        article_container = soup.select_one(selector)
+        result["etag"] = page["etag"]
+        result["last_modified"] = page["last_modified"]
+        return attach_local_images(result, images_dir)
+    except Exception as e:
+        return {"url": page["url"], "status": "error", "error": str(e), "chapters": []}
 
-        if not article_container:
-            return {
-                "url": url,
-                "status": "no_matches",
-                "chapters": [],
-            }
 
-        article_id = url.split("/")[-2]
+def iter_archived_results(
+    archive, selector="#content > article > div > div", images_dir="data/images"
+):
+    for page in archive.iter_pages():
+        result = parse_archived_page(page, selector, images_dir)
+        report_result(result)
+        yield result
 
-        published_date_element = article_container.select_one(
-            "div.mt-1.text-slate-600.text-base.text-sm"
-        )
-        published_date = (
-            published_date_element.get_text(strip=True)
-            if published_date_element
-            else ""
-        )
-        try:
-            published_date_iso = datetime.datetime.strptime(
-                published_date.strip(), "%b %d, %Y"
-            ).strftime("%Y-%m-%d")
-        except ValueError:
-            published_date_iso = ""
-
-        news_tag = article_container.find(["h2", "h1"], id="news")
-
-        if news_tag:
-            post_news_elements = []
-            current = news_tag.next_sibling
-            while current:
-                post_news_elements.append(str(current))
-                current = current.next_sibling
-            html_for_splitting = "".join(post_news_elements)
-        else:
-            html_for_splitting = str(article_container)
-
-        blocks = re.split(r"<hr\s*/?>", html_for_splitting, flags=re.IGNORECASE)
-
-        chapters = []
-        for i, block_html in enumerate(blocks):
-            block_soup = BeautifulSoup(block_html, "html.parser")
-
-            header_tag = block_soup.find(["h1", "h2", "strong"])
-            title = header_tag.get_text(strip=True) if header_tag else f"Section {i+1}"
-
-            if "deeplearning.ai" in title.lower() or "news" in title.lower():
-                continue
-
-            paragraphs = block_soup.find_all("p")
-            section_text = " ".join(
-                [p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)]
+
+async def process_url_async(
+    fetcher, url, selector, images_dir, headers=None, archive=None
+):
+    with tracing.trace("scrape.page", url=url) as page:
+        result = await scrape_page(fetcher, url, selector, images_dir, headers, archive)
+        page.set(status=result["status"], chapters=len(result["chapters"]))
+        return result
+
+
+async def scrape_page(fetcher, url, selector, images_dir, headers=None, archive=None):
+    try:
+        with tracing.span("fetch") as fetch:
+            response = await fetcher.fetch(url, headers=headers)
+            fetch.set(status=response.status, bytes=response.size)
+        if response.status == 304:
+            return {"url": url, "status": "not_modified", "chapters": []}
+        response.raise_for_status()
+
+        if archive is not None:
+            await asyncio.to_thread(
+                archive.put_page,
+                url,
+                response.text,
+                response.headers.get("ETag", ""),
+                response.headers.get("Last-Modified", ""),
             )
 
-            images = []
-            for img in block_soup.find_all("img"):
-                img_url = img.get("src")
-                if img_url:
-                    processed_image = process_image(
-                        img_url, url, article_id, images_dir
-                    )
-                    if processed_image:
-                        images.append(processed_image)
-
-            if not section_text and not images:
-                continue
-
-            chapters.append(
-                {
-                    "title": title,
-                    "content": section_text,
-                    "images": images,
-                    "article_id": article_id,
-                    "url": url,
-                    "published_date": published_date_iso,
-                }
+        with tracing.span("parse"):
+            result = await asyncio.to_thread(
+                parse_article, response.text, url, selector
             )
+        if result["status"] != "success":
+            return result
 
-        return {
-            "url": url,
-            "status": "success",
-            "article_id": article_id,
-            "published_date": published_date_iso,
-            "chapters": chapters,
-        }
+        result["etag"] = response.headers.get("ETag", "")
+        result["last_modified"] = response.headers.get("Last-Modified", "")
+        with tracing.span("images"):
+            return await attach_images(fetcher, result, images_dir)
 
     except Exception as e:
         return {"url": url, "status": "error", "error": str(e), "chapters": []}
 
 
-def scrape_with_selector_parallel(
+def process_url(url, selector, images_dir, headers=None, archive=None):
+    async def run():
+        async with AsyncFetcher() as fetcher:
+            return await process_url_async(
+                fetcher, url, selector, images_dir, headers, archive
+            )
+
+    return asyncio.run(run())
+
+
+def report_result(result):
+    url = result["url"]
+    if result["status"] == "success":
+        print(f"Scraped: {url} -> {len(result['chapters'])} chapters")
+    elif result["status"] == "not_modified":
+        print(f"Not modified since last scrape: {url}")
+    elif result["status"] == "no_matches":
+        print(f"No matching elements found for: {url}")
+    else:
+        print(f"Error scraping {url}: {result.get('error', 'Unknown error')}")
+
+
+async def scrape_async(
     urls,
     selector="#content > article > div > div",
     images_dir="data/images",
     max_workers=10,
+    manifest=None,
+    on_result=None,
+    fetcher=None,
+    archive=None,
 ):
-    os.makedirs(images_dir, exist_ok=True)
+    manifest = manifest or {}
+    pending_urls = iter(urls)
+    owns_fetcher = fetcher is None
+    fetcher = await (fetcher or AsyncFetcher()).open()
+
+    async def worker():
+        for url in pending_urls:
+            result = await process_url_async(
+                fetcher,
+                url,
+                selector,
+                images_dir,
+                conditional_headers(manifest, url),
+                archive,
+            )
+            if on_result:
+                await asyncio.to_thread(on_result, result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max_workers)))
+    finally:
+        if owns_fetcher:
+            await fetcher.close()
 
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {
-            executor.submit(process_url, url, selector, images_dir): url for url in urls
-        }
 
-        for future in concurrent.futures.as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                result = future.result()
-                results.append(result)
-                if result["status"] == "success":
-                    print(f"Scraped: {url} -> {len(result['chapters'])} chapters")
-                elif result["status"] == "no_matches":
-                    print(f"No matching elements found for: {url}")
-                else:
-                    print(
-                        f"Error scraping {url}: {result.get('error', 'Unknown error')}"
-                    )
-            except Exception as e:
-                print(f"Error processing {url}: {e}")
-                results.append(
-                    {"url": url, "status": "error", "error": str(e), "chapters": []}
+def iter_scrape(
+    urls,
+    selector="#content > article > div > div",
+    images_dir="data/images",
+    max_workers=10,
+    manifest=None,
+    fetcher_factory=AsyncFetcher,
+    archive=None,
+):
+    os.makedirs(images_dir, exist_ok=True)
+    results = queue.Queue(maxsize=max_workers * 2)
+    errors = []
+
+    def run():
+        async def crawl():
+            async with fetcher_factory() as fetcher:
+                await scrape_async(
+                    urls,
+                    selector,
+                    images_dir,
+                    max_workers,
+                    manifest,
+                    results.put,
+                    fetcher,
+                    archive,
                 )
 
-    return results
+        try:
+            asyncio.run(crawl())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            results.put(None)
 
+    crawler = threading.Thread(target=run, daemon=True)
+    crawler.start()
+
+    while True:
+        result = results.get()
+        if result is None:
+            break
+        report_result(result)
+        yield result
+
+    crawler.join()
+    if errors:
+        raise errors[0]
 
-if __name__ == "__main__":
-    vector_store, chroma_client, chroma_collection = setup_chromadb("data/chroma_db")
+
+def scrape_with_selector_parallel(
+    urls,
+    selector="#content > article > div > div",
+    images_dir="data/images",
+    max_workers=10,
+    manifest=None,
+    archive=None,
+    fetcher_factory=AsyncFetcher,
+):
+    return list(
+        iter_scrape(
+            urls,
+            selector,
+            images_dir,
+            max_workers,
+            manifest,
+            fetcher_factory=fetcher_factory,
+            archive=archive,
+        )
+    )
+
+
+BATCH_URLS = [
+    f"https://www.deeplearning.ai/the-batch/issue-{i}/" for i in range(200, 302)
+] + [
+    "https://www.deeplearning.ai/the-batch/issue-i/",
+    "https://www.deeplearning.ai/the-batch/issue-ii/",
+    "https://www.deeplearning.ai/the-batch/issue-iii/",
+    "https://www.deeplearning.ai/the-batch/issue-iv/",
+    "https://www.deeplearning.ai/the-batch/issue-v/",
+    "https://www.deeplearning.ai/the-batch/issue-vi/",
+    "https://www.deeplearning.ai/the-batch/issue-vii/",
+    "https://www.deeplearning.ai/the-batch/issue-viii/",
+    "https://www.deeplearning.ai/the-batch/issue-ix/",
+    "https://www.deeplearning.ai/the-batch/issue-x/",
+    "https://www.deeplearning.ai/the-batch/issue-xi/",
+    "https://www.deeplearning.ai/the-batch/issue-xii/",
+    "https://www.deeplearning.ai/the-batch/issue-xiii/",
+    "https://www.deeplearning.ai/the-batch/issue-xiv/",
+    "https://www.deeplearning.ai/the-batch/issue-xv/",
+    "https://www.deeplearning.ai/the-batch/issue-xvi/",
+]
+CSS_SELECTOR = "#content > article "
+
+
+def run_scrape(args):
+    vector_store, chroma_client, chroma_collection = setup_chromadb(
+        args.db_path, backend=args.backend, hot_days=args.hot_days
+    )
 
     if chroma_collection.count() == 0:
         print("Database is empty. Starting initial data scraping...")
-
-        urls_arabic = [
-            f"https://www.deeplearning.ai/the-batch/issue-{i}/" for i in range(200, 302)
-        ]
-
-        urls_roman = [
-            "https://www.deeplearning.ai/the-batch/issue-i/",
-            "https://www.deeplearning.ai/the-batch/issue-ii/",
-            "https://www.deeplearning.ai/the-batch/issue-iii/",
-            "https://www.deeplearning.ai/the-batch/issue-iv/",
-            "https://www.deeplearning.ai/the-batch/issue-v/",
-            "https://www.deeplearning.ai/the-batch/issue-vi/",
-            "https://www.deeplearning.ai/the-batch/issue-vii/",
-            "https://www.deeplearning.ai/the-batch/issue-viii/",
-            "https://www.deeplearning.ai/the-batch/issue-ix/",
-            "https://www.deeplearning.ai/the-batch/issue-x/",
-            "https://www.deeplearning.ai/the-batch/issue-xi/",
-            "https://www.deeplearning.ai/the-batch/issue-xii/",
-            "https://www.deeplearning.ai/the-batch/issue-xiii/",
-            "https://www.deeplearning.ai/the-batch/issue-xiv/",
-            "https://www.deeplearning.ai/the-batch/issue-xv/",
-            "https://www.deeplearning.ai/the-batch/issue-xvi/",
-        ]
-
-        urls_to_scrape = urls_arabic + urls_roman
-        css_selector = "#content > article "
-
-        print("Starting parallel scraping...")
-        results = scrape_with_selector_parallel(
-            urls_to_scrape, css_selector, "data/images", max_workers=10
+        manifest = {}
+    else:
+        print(
+            f"Database already contains {chroma_collection.count()} documents. "
+            "Starting incremental refresh..."
+        )
+        try:
+            manifest = load_db_manifest(args.manifest_path, chroma_collection.count())
+        except ValueError as e:
+            print(e)
+            raise SystemExit(1)
+
+    print("Starting streaming scrape and ingest...")
+    pipeline = IngestPipeline(
+        vector_store,
+        manifest=manifest,
+        manifest_path=args.manifest_path,
+        batch_size=args.batch_size,
+        layout=args.layout,
+    )
+    try:
+        pipeline.run(
+            iter_scrape(
+                BATCH_URLS,
+                CSS_SELECTOR,
+                args.images_dir,
+                max_workers=args.max_workers,
+                manifest=manifest,
+                archive=PageArchive(args.archive_dir),
+            )
         )
+    finally:
+        if hasattr(vector_store, "rollover"):
+            vector_store.rollover()
+        bump_collection_version(args.db_path)
+    return vector_store, chroma_collection
+
+
+def run_rebuild(args):
+    archive = PageArchive(args.archive_dir)
+    if len(archive) == 0:
+        print(f"Archive at {args.archive_dir} is empty. Run a scrape first.")
+        raise SystemExit(1)
+
+    print(f"Rebuilding index from {len(archive)} archived pages...")
+    vector_store, chroma_client, chroma_collection = setup_chromadb(
+        args.db_path, reset=True, backend=args.backend, hot_days=args.hot_days
+    )
+    configure_chapter_store(args.db_path).clear()
+    dedup_index = get_dedup_index()
+    if dedup_index is not None:
+        dedup_index.clear()
+    pipeline = IngestPipeline(
+        vector_store,
+        manifest={},
+        manifest_path=args.manifest_path,
+        batch_size=args.batch_size,
+        layout=args.layout,
+    )
+    try:
+        pipeline.run(iter_archived_results(archive, CSS_SELECTOR, args.images_dir))
+    finally:
+        if hasattr(vector_store, "rollover"):
+            vector_store.rollover()
+        bump_collection_version(args.db_path)
+    return vector_store, chroma_collection
 
-        successful = sum(1 for r in results if r["status"] == "success")
-        print(f"Successfully scraped {successful} out of {len(urls_to_scrape)} URLs")
 
-        print("Loading data into ChromaDB...")
-        index = data_load(results, vector_store)
-        print("Data loading completed!")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape The Batch into ChromaDB")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="scrape",
+        choices=[
+            "scrape",
+            "rebuild-from-archive",
+            "migrate-chapter-store",
+            "compact-archive",
+        ],
+    )
+    parser.add_argument("--db-path", default="data/chroma_db")
+    parser.add_argument("--images-dir", default="data/images")
+    parser.add_argument("--archive-dir", default="data/archive")
+    parser.add_argument(
+        "--manifest-path", default=None, help="Defaults to <db-path>/manifest.json"
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-workers", type=int, default=10)
+    parser.add_argument(
+        "--backend", default=VECTOR_BACKEND, choices=["chroma", "numpy"]
+    )
+    parser.add_argument("--layout", default=CHUNK_LAYOUT, choices=LAYOUTS)
+    parser.add_argument(
+        "--hot-days",
+        type=int,
+        default=TIER_HOT_DAYS,
+        help="Split the index into a hot tier of this many days and yearly cold "
+        "tiers (0 keeps a single collection)",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help="MinHash similarity above which chapters are skipped (0 disables)",
+    )
+    args = parser.parse_args()
+    args.manifest_path = args.manifest_path or manifest_path(args.db_path)
+    configure_dedup(args.dedup_threshold, args.db_path)
+
+    if args.command == "migrate-chapter-store":
+        vector_store, _, _ = setup_chromadb(args.db_path, backend=args.backend)
+        migrate_chapter_store(vector_store)
+        raise SystemExit(0)
+
+    if args.command == "compact-archive":
+        archive = PageArchive(args.archive_dir)
+        reclaimed = archive.compact()
+        print(f"Compacted {len(archive)} archived pages, reclaimed {reclaimed} bytes")
+        archive.close()
+        raise SystemExit(0)
+
+    if args.command == "rebuild-from-archive":
+        vector_store, chroma_collection = run_rebuild(args)
     else:
-        print(f"Database already contains {chroma_collection.count()} documents.")
-        print("Skipping scraping process.")
+        vector_store, chroma_collection = run_scrape(args)
+
+    index = VectorStoreIndex.from_vector_store(vector_store)
+    print("Data loading completed!")
 
     print("\nVerifying database content...")
     try:
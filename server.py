@@ -0,0 +1,280 @@
+import json
+import asyncio
+import argparse
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from llama_index.core import Settings
+
+
+def query_instruction(embed_model):
+    instruction = getattr(embed_model, "query_instruction", None)
+    if instruction is None:
+        try:
+            from llama_index.embeddings.huggingface.utils import (
+                get_query_instruct_for_model_name,
+            )
+        except ImportError:
+            return None
+        instruction = get_query_instruct_for_model_name(
+            getattr(embed_model, "model_name", "")
+        )
+    return instruction
+
+
+def embed_queries(questions):
+    embed_model = Settings.embed_model
+    batch = getattr(embed_model, "get_query_embedding_batch", None)
+    if batch is not None:
+        return batch(questions)
+
+    instruction = query_instruction(embed_model)
+    if instruction is None:
+        return [embed_model.get_query_embedding(question) for question in questions]
+    return embed_model.get_text_embedding_batch(
+        [f"{instruction}{question}" for question in questions]
+    )
+
+
+def read_date(payload, key):
+    value = payload.get(key) or None
+    if value is None:
+        return None
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text=f"'{key}' must be a YYYY-MM-DD date")
+    return value
+
+
+class EmbeddingBatcher:
+    def __init__(self, embed_batch=embed_queries, window=0.005, max_batch=32):
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self.pending = []
+        self.flush_handle = None
+        self.batches = 0
+        self.items = 0
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((text, future))
+
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self.executor, self.embed_batch, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class QueryService:
+    def __init__(
+        self,
+        engine,
+        llm_concurrency=4,
+        retrieval_workers=8,
+        batch_window_ms=5,
+        max_batch=32,
+    ):
+        self.engine = engine
+        self.llm_concurrency = llm_concurrency
+        self.llm_slots = None
+        self.batcher = EmbeddingBatcher(
+            window=batch_window_ms / 1000, max_batch=max_batch
+        )
+        self.pool = ThreadPoolExecutor(
+            max_workers=retrieval_workers, thread_name_prefix="retrieval"
+        )
+
+    async def on_startup(self, app):
+        self.llm_slots = asyncio.Semaphore(self.llm_concurrency)
+
+    async def read_request(self, request):
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise web.HTTPBadRequest(text="Request body must be a JSON object")
+
+        question = (payload.get("question") or "").strip()
+        if not question:
+            raise web.HTTPBadRequest(text="Missing 'question'")
+
+        return question, read_date(payload, "date_from"), read_date(payload, "date_to")
+
+    def cached_answer(self, question, date_from, date_to):
+        if date_from or date_to:
+            return None
+        return self.engine.answer_cache.get_exact(question)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, lambda: func(*args, **kwargs))
+
+    async def search(self, request):
+        question, date_from, date_to = await self.read_request(request)
+        embedding = await self.batcher.embed(question)
+        sources = await self.run(
+            self.engine.search,
+            question,
+            date_from=date_from,
+            date_to=date_to,
+            embedding=embedding,
+        )
+        return web.json_response({"sources": sources})
+
+    async def query(self, request):
+        question, date_from, date_to = await self.read_request(request)
+        cached = self.cached_answer(question, date_from, date_to)
+        if cached is not None:
+            answer, sources = cached
+            return web.json_response({"answer": answer, "sources": sources})
+
+        embedding = await self.batcher.embed(question)
+        async with self.llm_slots:
+            answer, sources = await self.run(
+                self.engine.query,
+                question,
+                date_from=date_from,
+                date_to=date_to,
+                embedding=embedding,
+            )
+        return web.json_response({"answer": answer, "sources": sources})
+
+    async def stream(self, request):
+        question, date_from, date_to = await self.read_request(request)
+        cached = self.cached_answer(question, date_from, date_to)
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        if cached is not None:
+            for event in self.engine.cached_events(cached):
+                await response.write((json.dumps(event) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+
+        embedding = await self.batcher.embed(question)
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            stream = self.engine.query_stream(
+                question,
+                date_from=date_from,
+                date_to=date_to,
+                embedding=embedding,
+            )
+            try:
+                for event in stream:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            except Exception as e:
+                error = {"type": "error", "error": str(e)}
+                loop.call_soon_threadsafe(events.put_nowait, error)
+            finally:
+                stream.close()
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+        async with self.llm_slots:
+            producer = loop.run_in_executor(self.pool, produce)
+            try:
+                while (event := await events.get()) is not None:
+                    await response.write((json.dumps(event) + "\n").encode("utf-8"))
+            except ConnectionResetError:
+                cancelled.set()
+                await producer
+                return response
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            await producer
+
+        await response.write_eof()
+        return response
+
+    async def health(self, request):
+        return web.json_response(
+            {**self.engine.health(), "embedding_batches": self.batcher.stats()}
+        )
+
+
+def create_app(engine, **service_options):
+    service = QueryService(engine, **service_options)
+    app = web.Application()
+    app["service"] = service
+    app.on_startup.append(service.on_startup)
+    app.add_routes(
+        [
+            web.post("/search", service.search),
+            web.post("/query", service.query),
+            web.post("/stream", service.stream),
+            web.get("/health", service.health),
+        ]
+    )
+    return app
+
+
+if __name__ == "__main__":
+    from chat_engine import get_shared_engine
+
+    parser = argparse.ArgumentParser(description="HTTP query service for RAGEngine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db-path", default="data/chroma_db")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--retrieval-workers", type=int, default=8)
+    parser.add_argument("--batch-window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    engine = get_shared_engine(args.db_path)
+    app = create_app(
+        engine,
+        llm_concurrency=args.llm_concurrency,
+        retrieval_workers=args.retrieval_workers,
+        batch_window_ms=args.batch_window_ms,
+        max_batch=args.max_batch,
+    )
+    web.run_app(app, host=args.host, port=args.port)
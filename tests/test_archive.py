@@ -0,0 +1,51 @@
+import os
+
+from archive import PageArchive
+
+
+def test_compact_drops_superseded_records(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    first_path = archive.records_path
+    archive.put_page("https://a", "first version " * 50, etag="1")
+    archive.put_page("https://b", "other page " * 50)
+    archive.put_page("https://a", "second version " * 50, etag="2")
+    before = os.path.getsize(archive.records_path)
+
+    reclaimed = archive.compact()
+
+    assert reclaimed > 0
+    assert os.path.getsize(archive.records_path) == before - reclaimed
+    assert archive.get_page("https://a")["html"] == "second version " * 50
+    assert archive.get_page("https://a")["etag"] == "2"
+    assert archive.get_page("https://b")["html"] == "other page " * 50
+    assert archive.compact() == 0
+    assert not os.path.exists(first_path)
+
+    archive.put_page("https://c", "after compaction")
+    archive.close()
+
+    reopened = PageArchive(str(tmp_path))
+    assert [page["url"] for page in reopened.iter_pages()] == [
+        "https://b",
+        "https://a",
+        "https://c",
+    ]
+    reopened.close()
+
+
+def test_unfinished_compaction_leaves_the_committed_records(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.put_page("https://a", "old " * 50)
+    archive.put_page("https://a", "new " * 50)
+    archive.close()
+    with open(tmp_path / "records.1.bin", "wb") as f:
+        f.write(b"half-written compaction")
+
+    reopened = PageArchive(str(tmp_path))
+    assert reopened.get_page("https://a")["html"] == "new " * 50
+    assert reopened.compact() > 0
+    assert reopened.get_page("https://a")["html"] == "new " * 50
+    assert [name for name in os.listdir(tmp_path) if name.startswith("records")] == [
+        "records.1.bin"
+    ]
+    reopened.close()
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import Future
+
+from caption_cache import CaptionCache, image_digest
+from image_processor import CaptionService, StubCaptioner
+
+
+class CountingCaptioner(StubCaptioner):
+    def __init__(self, release=None):
+        super().__init__()
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = release
+
+    def caption(self, image_bytes):
+        self.calls += 1
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(10)
+        return super().caption(image_bytes)
+
+
+class InlineExecutor:
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def write_image(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_repeated_images_hit_the_cache(tmp_path):
+    cache = CaptionCache(str(tmp_path / "captions.sqlite"))
+    captioner = CountingCaptioner()
+    service = CaptionService(captioner, cache)
+    banner = write_image(tmp_path, "banner.png", b"banner")
+    copy = write_image(tmp_path, "copy.png", b"banner")
+
+    first = service.caption_paths([banner, copy, banner])
+    assert first[0] == first[1] == first[2]
+    assert service.caption_path(banner) == first[0]
+    assert captioner.calls == 1
+    assert cache.get(image_digest(b"banner"), captioner.name) == first[0]
+
+    reopened = CaptionService(captioner, CaptionCache(cache.path))
+    assert reopened.caption_path(copy) == first[0]
+    assert captioner.calls == 1
+
+
+def test_concurrent_requests_share_one_in_flight_caption(tmp_path):
+    release = threading.Event()
+    captioner = CountingCaptioner(release)
+    service = CaptionService(captioner)
+    path = write_image(tmp_path, "chart.png", b"chart")
+    digest = image_digest(b"chart")
+
+    submit = service._submit
+    submitted = []
+
+    def recording_submit(digest, image_bytes):
+        future = submit(digest, image_bytes)
+        submitted.append(future)
+        return future
+
+    service._submit = recording_submit
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.caption_path(path)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    assert captioner.started.wait(5)
+    for _ in range(500):
+        if len(submitted) == 2:
+            break
+        threads[1].join(0.01)
+    assert submitted[0] is submitted[1] is service.in_flight[digest]
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results[0] == results[1] == submitted[0].result()
+    assert captioner.calls == 1
+
+
+def test_submitting_an_already_finished_caption_does_not_deadlock(tmp_path):
+    service = CaptionService(CountingCaptioner())
+    service.executor = InlineExecutor()
+    path = write_image(tmp_path, "logo.png", b"logo")
+
+    thread = threading.Thread(target=service.caption_path, args=(path,), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert service.in_flight == {}
@@ -0,0 +1,29 @@
+from chapter_store import chapter_store_path, configure_chapter_store, get_chapter_store
+
+
+def record(chapter_id):
+    return {
+        "chapter_id": chapter_id,
+        "article_id": "issue-1",
+        "url": "https://example.test/issue-1/",
+        "title": "Title",
+        "published_date": "2024-01-01",
+        "published_ts": 1704067200,
+        "images": [{"url": "https://img.test/a.png", "caption": "A chart"}],
+    }
+
+
+def test_stores_are_scoped_to_their_database(tmp_path):
+    first = configure_chapter_store(str(tmp_path / "first"))
+    first.put_many([record("issue-1-000")])
+    second = configure_chapter_store(str(tmp_path / "second"))
+    second.put_many([record("issue-1-000")])
+
+    assert get_chapter_store() is second
+    assert first.path == chapter_store_path(str(tmp_path / "first"))
+
+    second.clear()
+    assert len(second) == 0
+    assert first.get_images(["issue-1-000"]) == {
+        "issue-1-000": [{"url": "https://img.test/a.png", "caption": "A chart"}]
+    }
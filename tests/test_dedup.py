@@ -0,0 +1,76 @@
+import random
+
+from dedup import NearDuplicateIndex, configure_dedup, covered_urls, dedup_path
+from manifest import diff_result, forget_chapters, record_result
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def article(url, chapters):
+    return {
+        "status": "success",
+        "url": url,
+        "chapters": [
+            {
+                "id": chapter_id,
+                "title": "Promo",
+                "content": content,
+                "url": url,
+                "published_date": "2024-01-01",
+            }
+            for chapter_id, content in chapters
+        ],
+    }
+
+
+def ingest(index, manifest, result):
+    changed, stale_ids, chapter_hashes = diff_result(manifest, result)
+    forget_chapters(manifest, index.forget(stale_ids))
+    kept, _ = index.filter(changed)
+    record_result(manifest, result, chapter_hashes)
+    return [chapter["id"] for chapter in kept]
+
+
+def test_editing_canonical_requeues_its_duplicates(tmp_path):
+    rng = random.Random(0)
+    promo = " ".join(rng.choice(WORDS) for _ in range(200))
+    edited = " ".join(rng.choice(WORDS) for _ in range(200))
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), threshold=0.8)
+    manifest = {}
+
+    a1 = article("https://example.test/a1/", [("a1-001", promo)])
+    a2 = article("https://example.test/a2/", [("a2-001", promo + " today")])
+    assert ingest(index, manifest, a1) == ["a1-001"]
+    assert ingest(index, manifest, a2) == []
+    assert index.covered_urls(["a1-001"]) == {"a1-001": ["https://example.test/a2/"]}
+    assert covered_urls(["a1-001"], index.path) == index.covered_urls(["a1-001"])
+
+    a1 = article("https://example.test/a1/", [("a1-001", edited)])
+    assert ingest(index, manifest, a1) == ["a1-001"]
+    assert index.covered_urls(["a1-001"]) == {}
+    assert manifest["https://example.test/a2/"]["chapters"] == {}
+
+    assert ingest(index, manifest, a2) == ["a2-001"]
+    assert index.stats()["chapters"] == 2
+    assert index.stats()["duplicates"] == 0
+
+
+def test_covered_urls_without_index_file(tmp_path):
+    assert covered_urls(["a1-001"], str(tmp_path / "missing.sqlite")) == {}
+    assert not (tmp_path / "missing.sqlite").exists()
+
+
+def test_each_database_has_its_own_index(tmp_path):
+    rng = random.Random(1)
+    promo = " ".join(rng.choice(WORDS) for _ in range(200))
+    first = configure_dedup(0.8, str(tmp_path / "a"))
+    assert first.path == dedup_path(str(tmp_path / "a"))
+    assert ingest(first, {}, article("https://example.test/a1/", [("a1", promo)]))
+
+    second = configure_dedup(db_path=str(tmp_path / "b"))
+    assert second is not first and second.threshold == 0.8
+    assert ingest(second, {}, article("https://example.test/b1/", [("b1", promo)]))
+
+    second.clear()
+    assert first.stats()["chapters"] == 1
+    assert configure_dedup(db_path=str(tmp_path / "b")) is second
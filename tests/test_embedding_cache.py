@@ -0,0 +1,22 @@
+import os
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def test_readers_leave_a_partial_row_for_the_writer_to_repair(tmp_path):
+    writer = EmbeddingCache("model", root=str(tmp_path))
+    writer.put_many(["a", "b"], np.eye(2, 4, dtype=np.float32))
+    with open(writer.vectors_path, "ab") as f:
+        f.write(b"\0" * 6)
+    size = os.path.getsize(writer.vectors_path)
+
+    reader = EmbeddingCache("model", root=str(tmp_path))
+    assert os.path.getsize(writer.vectors_path) == size
+    assert len(reader) == 2
+
+    writer.put_many(["c"], np.full((1, 4), 3.0, dtype=np.float32))
+    found = reader.get_many(["a", "b", "c"])
+    assert found["c"].tolist() == [3.0] * 4
+    assert found["b"].tolist() == [0.0, 1.0, 0.0, 0.0]
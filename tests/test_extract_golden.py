@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+from extract_bench import (  # noqa: E402
+    SELECTOR,
+    check_golden,
+    legacy_parse_article,
+    load_pages,
+    page_url,
+)
+
+PAGES_DIR = os.path.join(BENCHMARKS, "pages")
+GOLDEN_DIR = os.path.join(BENCHMARKS, "golden")
+
+
+def test_saved_pages_match_goldens():
+    pages = load_pages(PAGES_DIR, 0)
+    assert pages
+    assert check_golden(pages, GOLDEN_DIR, update=False) == []
+
+
+def test_goldens_come_from_the_legacy_parser():
+    for slug, html in load_pages(PAGES_DIR, 0):
+        with open(os.path.join(GOLDEN_DIR, f"{slug}.json"), encoding="utf-8") as f:
+            assert json.load(f) == legacy_parse_article(html, page_url(slug), SELECTOR)
+
+
+def test_missing_golden_is_seeded_from_legacy(tmp_path, monkeypatch):
+    import extract_bench
+
+    page = [
+        (
+            "issue-1",
+            "<html><body><div id='content'><article>"
+            "<p><strong>Title</strong></p><p>Body text.</p>"
+            "</article></div></body></html>",
+        )
+    ]
+    monkeypatch.setattr(
+        extract_bench, "extract_article", lambda html, url, selector: {"changed": 1}
+    )
+    assert check_golden(page, str(tmp_path), update=False) == ["issue-1"]
@@ -0,0 +1,17 @@
+import pytest
+
+from manifest import load_db_manifest, manifest_path, save_manifest
+
+
+def test_manifest_lives_next_to_each_database(tmp_path):
+    first = manifest_path(str(tmp_path / "a"))
+    second = manifest_path(str(tmp_path / "b"))
+    save_manifest({"https://a": {"etag": "1"}}, first)
+
+    assert load_db_manifest(first, 10) == {"https://a": {"etag": "1"}}
+    assert load_db_manifest(second, 0) == {}
+
+
+def test_populated_index_without_manifest_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="rebuild-from-archive"):
+        load_db_manifest(manifest_path(str(tmp_path)), 42)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from numpy_store import NumpyVectorStore
+
+
+def make_nodes(rng, start, count):
+    return [
+        TextNode(
+            id_=f"n{i}",
+            text=f"node {i}",
+            embedding=rng.standard_normal(16).tolist(),
+        )
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_appends_survive_reopen_and_compaction(tmp_path, quantization):
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(str(tmp_path), quantization=quantization)
+    nodes = []
+    for start in range(0, 1200, 100):
+        batch = make_nodes(rng, start, 100)
+        store.add(batch)
+        nodes += batch
+
+    assert store.count() == 1200
+    assert np.load(store.matrix_path, mmap_mode="r").shape == (1200, 16)
+
+    store.delete_nodes([f"n{i}" for i in range(0, 1200, 2)])
+    store.add(make_nodes(rng, 5000, 1))
+    assert store.count() == 601
+    assert store._stored_rows() == 601
+
+    reopened = NumpyVectorStore(str(tmp_path), quantization=quantization)
+    target = nodes[7]
+    result = reopened.query(
+        VectorStoreQuery(query_embedding=target.embedding, similarity_top_k=1)
+    )
+    assert result.ids == ["n7"]
+    assert result.similarities[0] == pytest.approx(1.0, abs=1e-2)
+
+
+@pytest.mark.parametrize("quantization", ["float32", "int8"])
+def test_reader_sees_deletes_and_compaction_from_another_writer(tmp_path, quantization):
+    rng = np.random.default_rng(1)
+    writer = NumpyVectorStore(str(tmp_path), quantization=quantization)
+    chapters = {}
+    for c in range(10):
+        chapter = make_nodes(rng, 10 * c, 2)
+        for node in chapter:
+            node.relationships = {}
+            node.metadata["chapter"] = f"c{c}"
+        chapters[f"c{c}"] = chapter
+        writer.add(chapter)
+    by_chapter = {node.node_id: c for c, nodes in chapters.items() for node in nodes}
+    reader = NumpyVectorStore(str(tmp_path), quantization=quantization)
+
+    def top_ids(node, k=3):
+        return reader.query(
+            VectorStoreQuery(query_embedding=node.embedding, similarity_top_k=k)
+        ).ids
+
+    writer.delete_nodes([node.node_id for node in chapters["c3"]])
+    assert not {by_chapter[i] for i in top_ids(chapters["c3"][0], k=20)} & {"c3"}
+
+    for c in ("c0", "c1", "c2"):
+        writer.delete_nodes([node.node_id for node in chapters[c]])
+    writer.add(make_nodes(rng, 500, 1))
+    assert writer._stored_rows() == 13
+
+    assert top_ids(chapters["c5"][0], k=1) == [chapters["c5"][0].node_id]
+    assert reader.count() == 13
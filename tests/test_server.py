@@ -0,0 +1,100 @@
+import json
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from answer_cache import AnswerCache
+from chat_engine import RAGEngine
+from server import create_app, read_date
+
+
+class FakeEngine:
+    cached_events = staticmethod(RAGEngine.cached_events)
+
+    def __init__(self, tokens=3):
+        self.answer_cache = AnswerCache()
+        self.tokens = tokens
+        self.calls = 0
+        self.closed = threading.Event()
+
+    def query(self, question, **kwargs):
+        self.calls += 1
+        return "fresh", []
+
+    def query_stream(self, question, **kwargs):
+        self.calls += 1
+        try:
+            for i in range(self.tokens):
+                yield {"type": "token", "text": str(i)}
+        finally:
+            self.closed.set()
+
+
+def failing_embed(questions):
+    raise AssertionError("cached questions must not be embedded")
+
+
+async def with_client(engine, check):
+    app = create_app(engine)
+    app["service"].batcher.embed_batch = failing_embed
+    async with TestClient(TestServer(app)) as client:
+        await check(client)
+
+
+def test_read_date_accepts_iso_dates_and_blanks():
+    payload = {"date_from": "2024-01-01", "date_to": ""}
+    assert read_date(payload, "date_from") == "2024-01-01"
+    assert read_date(payload, "date_to") is None
+    assert read_date(payload, "missing") is None
+
+
+@pytest.mark.parametrize("value", ["2024-13-01", "yesterday", 20240101])
+def test_read_date_rejects_invalid_dates(value):
+    with pytest.raises(web.HTTPBadRequest):
+        read_date({"date_from": value}, "date_from")
+
+
+@pytest.mark.parametrize("body", ["[]", '"question"', "3"])
+def test_non_object_payloads_are_rejected(body):
+    async def check(client):
+        response = await client.post("/query", data=body)
+        assert response.status == 400
+
+    asyncio.run(with_client(FakeEngine(), check))
+
+
+def test_cached_answers_skip_embedding_and_the_llm():
+    engine = FakeEngine()
+    engine.answer_cache.put("What is new?", [1.0, 0.0], ("cached", [{"url": "u"}]))
+
+    async def check(client):
+        response = await client.post("/query", json={"question": "what is new"})
+        assert await response.json() == {"answer": "cached", "sources": [{"url": "u"}]}
+
+        response = await client.post("/stream", json={"question": "What is new?"})
+        events = [json.loads(line) for line in (await response.text()).splitlines()]
+        assert [event["type"] for event in events] == ["sources", "token", "done"]
+        assert events[-1]["answer"] == "cached"
+
+    asyncio.run(with_client(engine, check))
+    assert engine.calls == 0
+
+
+def test_stream_stops_producing_when_the_client_disconnects():
+    engine = FakeEngine(tokens=10_000_000)
+
+    async def check(client):
+        client.server.app["service"].batcher.embed_batch = lambda texts: [
+            [1.0] for _ in texts
+        ]
+        response = await client.post("/stream", json={"question": "long answer"})
+        await response.content.readline()
+        response.close()
+        assert await asyncio.get_running_loop().run_in_executor(
+            None, engine.closed.wait, 10
+        )
+
+    asyncio.run(with_client(engine, check))
@@ -0,0 +1,120 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+
+class ThumbnailCache:
+    def __init__(
+        self,
+        cache_dir="data/thumbnails",
+        max_size=(640, 640),
+        image_format="WEBP",
+        quality=80,
+        memory_items=256,
+        max_workers=6,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.image_format = image_format
+        self.quality = quality
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="thumbnail"
+        )
+
+    def key(self, source):
+        size = f"{self.max_size[0]}x{self.max_size[1]}"
+        return hashlib.sha1(f"{source}|{size}".encode("utf-8")).hexdigest()
+
+    def cache_path(self, key):
+        ext = ".webp" if self.image_format == "WEBP" else ".jpg"
+        return os.path.join(self.cache_dir, key[:2], f"{key}{ext}")
+
+    def _remember(self, key, data):
+        with self.lock:
+            self.memory[key] = data
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+    def _recall(self, key):
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+            return data
+
+    def _encode(self, image):
+        image.thumbnail(self.max_size)
+        if self.image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+
+        buffer = BytesIO()
+        image.save(buffer, format=self.image_format, quality=self.quality)
+        return buffer.getvalue()
+
+    def _load(self, key, open_source):
+        data = self._recall(key)
+        if data is not None:
+            return data
+
+        path = self.cache_path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            with open_source() as image:
+                data = self._encode(image)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        self._remember(key, data)
+        return data
+
+    def from_path(self, path):
+        return self._load(self.key(os.path.abspath(path)), lambda: Image.open(path))
+
+    def from_url(self, url):
+        def fetch():
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+            return Image.open(BytesIO(response.content))
+
+        return self._load(self.key(url), fetch)
+
+    def get(self, path=None, url=None):
+        if path and os.path.exists(path):
+            return self.from_path(path)
+        if url:
+            return self.from_url(url)
+        raise FileNotFoundError(f"No local file or URL for image: {path}")
+
+    def submit(self, path=None, url=None):
+        return self.executor.submit(self.get, path, url)
+
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache(cache_dir="data/thumbnails"):
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache(cache_dir)
+        return _thumbnail_cache
@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import List
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQueryResult,
+)
+
+import tracing
+from retriever import RecencyRetriever, SECONDS_PER_DAY, merge_parents, published_ts
+
+UNDATED = "undated"
+
+
+def tiers_path(db_path, collection_name="documents"):
+    return os.path.join(db_path, f"{collection_name}.tiers.json")
+
+
+def load_tiers(db_path, collection_name="documents"):
+    path = tiers_path(db_path, collection_name)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_tiers(tiers, db_path, collection_name="documents"):
+    os.makedirs(db_path, exist_ok=True)
+    path = tiers_path(db_path, collection_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(tiers, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hot_collection(collection_name):
+    return f"{collection_name}_hot"
+
+
+def cold_collection(collection_name, partition):
+    return f"{collection_name}_cold_{partition}"
+
+
+def cold_partition(ts):
+    return str(time.gmtime(ts).tm_year) if ts else UNDATED
+
+
+def node_ts(metadata):
+    return metadata.get("published_ts") or published_ts(
+        metadata.get("published_date", "")
+    )
+
+
+def partition_count(store):
+    return store.count() if hasattr(store, "count") else store.client.count()
+
+
+class TieredVectorStore:
+    stores_text = True
+    is_embedding_query = True
+
+    def __init__(
+        self,
+        db_path,
+        collection_name="documents",
+        hot_days=None,
+        backend=None,
+        reset=False,
+    ):
+        from vector_store import VECTOR_BACKEND, collection_count, setup_chromadb
+
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.backend = backend or VECTOR_BACKEND
+        self.tiers = load_tiers(db_path, collection_name)
+        if self.tiers is None:
+            untiered = collection_count(db_path, collection_name, self.backend)
+            if untiered and not reset:
+                raise ValueError(
+                    f"Collection '{collection_name}' in {db_path} already holds "
+                    f"{untiered} chunks without tiers. Rebuild it with "
+                    "`python scrapper.py rebuild-from-archive --hot-days N` "
+                    "to split it into tiers."
+                )
+            if untiered:
+                setup_chromadb(
+                    db_path, collection_name, reset=True, backend=backend, hot_days=0
+                )
+            self.tiers = {"hot_days": 90, "newest_ts": 0, "cold": []}
+        if hot_days:
+            self.tiers["hot_days"] = hot_days
+        self.stores = {}
+        self.lock = threading.RLock()
+        save_tiers(self.tiers, db_path, collection_name)
+
+    def store(self, name):
+        from vector_store import setup_chromadb
+
+        if name not in self.stores:
+            self.stores[name], _, _ = setup_chromadb(
+                self.db_path, name, backend=self.backend, hot_days=0
+            )
+        return self.stores[name]
+
+    def partitions(self):
+        return [hot_collection(self.collection_name)] + [
+            cold_collection(self.collection_name, partition)
+            for partition in self.tiers["cold"]
+        ]
+
+    def cutoff(self):
+        return self.tiers["newest_ts"] - self.tiers["hot_days"] * SECONDS_PER_DAY
+
+    def _route(self, ts, cutoff):
+        if ts and ts >= cutoff:
+            return hot_collection(self.collection_name)
+
+        partition = cold_partition(ts)
+        if partition not in self.tiers["cold"]:
+            self.tiers["cold"].append(partition)
+            self.tiers["cold"].sort()
+        return cold_collection(self.collection_name, partition)
+
+    def add(self, nodes, **add_kwargs):
+        if not nodes:
+            return []
+
+        with self.lock:
+            self.tiers["newest_ts"] = max(
+                [self.tiers["newest_ts"]] + [node_ts(node.metadata) for node in nodes]
+            )
+            cutoff = self.cutoff()
+            groups = {}
+            for node in nodes:
+                groups.setdefault(
+                    self._route(node_ts(node.metadata), cutoff), []
+                ).append(node)
+            for name, group in groups.items():
+                self.store(name).add(group)
+            save_tiers(self.tiers, self.db_path, self.collection_name)
+
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id, **delete_kwargs):
+        with self.lock:
+            for name in self.partitions():
+                self.store(name).delete(ref_doc_id=ref_doc_id)
+
+    def get_nodes(self, node_ids=None, filters=None):
+        with self.lock:
+            stores = [self.store(name) for name in self.partitions()]
+        return [node for store in stores for node in store.get_nodes(node_ids, filters)]
+
+    def count(self):
+        with self.lock:
+            return sum(partition_count(self.store(name)) for name in self.partitions())
+
+    def query(self, query, **kwargs):
+        with self.lock:
+            stores = [self.store(name) for name in self.partitions()]
+
+        hits = []
+        for store in stores:
+            result = store.query(query, **kwargs)
+            hits += zip(result.similarities or [], result.nodes or [])
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        hits = hits[: query.similarity_top_k]
+        return VectorStoreQueryResult(
+            nodes=[node for _, node in hits],
+            similarities=[score for score, _ in hits],
+            ids=[node.node_id for _, node in hits],
+        )
+
+    def clear(self):
+        with self.lock:
+            for name in self.partitions():
+                store = self.store(name)
+                if hasattr(store, "clear"):
+                    store.clear()
+                else:
+                    store.client.delete(ids=store.client.get(include=[])["ids"])
+            self.tiers.update(newest_ts=0, cold=[])
+            save_tiers(self.tiers, self.db_path, self.collection_name)
+
+    def rollover(self, batch_size=1000):
+        with self.lock:
+            cutoff = self.cutoff()
+            hot = self.store(hot_collection(self.collection_name))
+            if self.backend == "numpy":
+                moved = self._rollover_nodes(hot, cutoff)
+            else:
+                moved = self._rollover_collection(hot.client, cutoff, batch_size)
+            save_tiers(self.tiers, self.db_path, self.collection_name)
+
+        cutoff_date = time.strftime("%Y-%m-%d", time.gmtime(cutoff))
+        print(f"Moved {moved} chunks published before {cutoff_date} to cold tiers")
+        return moved
+
+    def _rollover_nodes(self, hot, cutoff):
+        aged = hot.get_nodes(
+            filters=MetadataFilters(
+                filters=[
+                    MetadataFilter(
+                        key="published_ts", value=cutoff, operator=FilterOperator.LT
+                    )
+                ]
+            )
+        )
+        groups = {}
+        for node in aged:
+            groups.setdefault(self._route(node_ts(node.metadata), cutoff), []).append(
+                node
+            )
+        for name, group in groups.items():
+            self.store(name).add(group)
+        hot.delete_nodes([node.node_id for node in aged])
+        return len(aged)
+
+    def _rollover_collection(self, collection, cutoff, batch_size):
+        moved = 0
+        while True:
+            batch = collection.get(
+                where={"published_ts": {"$lt": cutoff}},
+                limit=batch_size,
+                include=["embeddings", "metadatas", "documents"],
+            )
+            if not len(batch["ids"]):
+                return moved
+
+            groups = {}
+            for i, metadata in enumerate(batch["metadatas"]):
+                groups.setdefault(self._route(node_ts(metadata), cutoff), []).append(i)
+            for name, rows in groups.items():
+                self.store(name).client.upsert(
+                    ids=[batch["ids"][i] for i in rows],
+                    embeddings=[batch["embeddings"][i] for i in rows],
+                    metadatas=[batch["metadatas"][i] for i in rows],
+                    documents=[batch["documents"][i] for i in rows],
+                )
+            collection.delete(ids=list(batch["ids"]))
+            moved += len(batch["ids"])
+
+
+class TieredRetriever(BaseRetriever):
+    def __init__(self, hot, cold, executor=None):
+        self.hot = hot
+        self.cold = cold
+        self.ranker = hot or next(iter(cold.values()))
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max(1, min(8, len(cold))), thread_name_prefix="cold-tier"
+        )
+        super().__init__()
+
+    @property
+    def candidate_k(self):
+        return self.ranker.candidate_k
+
+    def with_date_range(self, date_from=None, date_to=None):
+        first = date.fromisoformat(date_from).year if date_from else None
+        last = date.fromisoformat(date_to).year if date_to else None
+        cold = {
+            partition: retriever.with_date_range(date_from, date_to)
+            for partition, retriever in self.cold.items()
+            if partition != UNDATED
+            and (first is None or int(partition) >= first)
+            and (last is None or int(partition) <= last)
+        }
+        hot = self.hot.with_date_range(date_from, date_to) if self.hot else None
+        if hot is None and not cold:
+            return self.ranker.with_date_range(date_from, date_to)
+        return TieredRetriever(hot, cold, self.executor)
+
+    @staticmethod
+    def candidates(retriever, query_bundle):
+        return merge_parents(retriever.vector_retriever.retrieve(query_bundle))
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        candidates = self.candidates(self.hot, query_bundle) if self.hot else []
+        qualified = [
+            node
+            for node in candidates
+            if node.score is not None and node.score >= self.ranker.score_cutoff
+        ]
+        if len(qualified) >= self.ranker.top_k or not self.cold:
+            return self.ranker.rank(candidates)
+
+        with tracing.span("retrieve.cold", partitions=len(self.cold)):
+            futures = [
+                self.executor.submit(self.candidates, retriever, query_bundle)
+                for retriever in self.cold.values()
+            ]
+            for future in futures:
+                candidates.extend(future.result())
+        return self.ranker.rank(merge_parents(candidates))
+
+
+def tiered_retriever(db_path, collection_name="documents", backend=None, **kwargs):
+    from vector_store import get_existing_index
+
+    tiers = load_tiers(db_path, collection_name)
+    hot_index = get_existing_index(
+        db_path, hot_collection(collection_name), backend=backend
+    )
+    cold_indexes = {}
+    for partition in tiers["cold"]:
+        index = get_existing_index(
+            db_path, cold_collection(collection_name, partition), backend=backend
+        )
+        if index is not None:
+            cold_indexes[partition] = index
+
+    hot = RecencyRetriever(hot_index, **kwargs) if hot_index else None
+    cold = {
+        partition: RecencyRetriever(index, **kwargs)
+        for partition, index in cold_indexes.items()
+    }
+    if hot is None and not cold:
+        return None, None
+
+    index = hot_index or next(iter(cold_indexes.values()))
+    return index, TieredRetriever(hot, cold)
+
+
+if __name__ == "__main__":
+    from vector_store import VECTOR_BACKEND, bump_collection_version
+
+    parser = argparse.ArgumentParser(description="Manage hot/cold date tiers")
+    parser.add_argument("command", choices=["rollover", "status"])
+    parser.add_argument("--db-path", default="data/chroma_db")
+    parser.add_argument("--collection", default="documents")
+    parser.add_argument("--hot-days", type=int, default=None)
+    parser.add_argument(
+        "--backend", default=VECTOR_BACKEND, choices=["chroma", "numpy"]
+    )
+    args = parser.parse_args()
+
+    if load_tiers(args.db_path, args.collection) is None and not args.hot_days:
+        parser.error(f"{args.db_path} is not tiered; pass --hot-days to tier it")
+
+    try:
+        store = TieredVectorStore(
+            args.db_path, args.collection, hot_days=args.hot_days, backend=args.backend
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "rollover":
+        store.rollover()
+        bump_collection_version(args.db_path, args.collection)
+
+    print(json.dumps(store.tiers, indent=2, sort_keys=True))
+    for name in store.partitions():
+        print(f"{name}: {partition_count(store.store(name))} chunks")
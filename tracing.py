@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import contextvars
+from collections import defaultdict
+
+import numpy as np
+
+DEFAULT_TRACE_PATH = "data/traces.jsonl"
+
+_current = contextvars.ContextVar("trace", default=None)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class TraceWriter:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, attrs, root=False):
+        self.name = name
+        self.attrs = attrs
+        self.root = root
+        self.trace = None
+        self.token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.trace = None if self.root else _current.get()
+        if self.trace is None:
+            self.trace = Trace(self.name, self.attrs)
+            self.token = _current.set(self.trace)
+        self.start_wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        record = {
+            "name": self.name,
+            "start": self.start_wall,
+            "duration_ms": round(duration_ms, 3),
+            "thread": threading.current_thread().name,
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+
+        if self.token is None:
+            with self.trace.lock:
+                self.trace.spans.append(record)
+            return False
+
+        try:
+            _current.reset(self.token)
+        except ValueError:
+            pass
+        writer = _writer
+        if writer is not None:
+            writer.write({"trace": self.trace.id, **record, "spans": self.trace.spans})
+        return False
+
+
+def enable(path=DEFAULT_TRACE_PATH):
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.path != path:
+            if _writer is not None:
+                _writer.close()
+            _writer = TraceWriter(path)
+    return _writer
+
+
+def disable():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = None
+
+
+def trace(name, **attrs):
+    if _writer is None:
+        return NULL_SPAN
+    return Span(name, attrs, root=True)
+
+
+def span(name, **attrs):
+    if _writer is None:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+
+def isolated(generator):
+    if _writer is None:
+        yield from generator
+        return
+
+    context = contextvars.copy_context()
+    while True:
+        try:
+            item = context.run(next, generator)
+        except StopIteration:
+            return
+        try:
+            yield item
+        except GeneratorExit:
+            context.run(generator.close)
+            raise
+
+
+def load_traces(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def summarize(path):
+    durations = defaultdict(list)
+    for record in load_traces(path):
+        durations[record["name"]].append(record["duration_ms"])
+        for child in record.get("spans", []):
+            durations[f"{record['name']} > {child['name']}"].append(
+                child["duration_ms"]
+            )
+
+    rows = []
+    for name, values in sorted(durations.items()):
+        values = np.array(values)
+        rows.append(
+            {
+                "name": name,
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "total_ms": float(values.sum()),
+            }
+        )
+    return rows
+
+
+def format_summary(rows):
+    width = max([len(row["name"]) for row in rows] + [4])
+    lines = [
+        f"{'span':<{width}} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} "
+        f"{'p99 ms':>10} {'total ms':>12}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<{width}} {row['count']:>7} {row['p50_ms']:>10.2f} "
+            f"{row['p95_ms']:>10.2f} {row['p99_ms']:>10.2f} {row['total_ms']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+_env_path = os.getenv("RAG_TRACE", "")
+if _env_path and _env_path != "0":
+    enable(DEFAULT_TRACE_PATH if _env_path == "1" else _env_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a JSONL trace file")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRACE_PATH)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Trace file not found: {args.path}")
+        sys.exit(1)
+
+    rows = summarize(args.path)
+    print(json.dumps(rows, indent=2) if args.json else format_summary(rows))
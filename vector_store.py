@@ -1,23 +1,156 @@
 import os
-import chromadb
+import uuid
+import threading
 from llama_index.core import VectorStoreIndex
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core import Document, Settings
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
 
-from image_processor import caption_image
+import tracing
+from chapter_store import (
+    chapter_record,
+    configure_chapter_store,
+    get_chapter_store,
+    metadata_record,
+)
+from context import embed_sentences
+from dedup import configure_dedup, get_dedup_index
+from embedding_cache import get_model_cache
+from retriever import published_ts
+from tiers import TieredVectorStore, load_tiers
 
+from image_processor import get_caption_service
 
-def setup_chromadb(db_path=None, collection_name="documents"):
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+NUMPY_QUANTIZATION = os.getenv("NUMPY_QUANTIZATION", "float32")
+CHUNK_LAYOUT = os.getenv("CHUNK_LAYOUT", "chapter")
+LAYOUTS = ("chapter", "hierarchical")
+CHILD_CHUNK_SIZE = 256
+CHILD_CHUNK_OVERLAP = 32
+TIER_HOT_DAYS = int(os.getenv("TIER_HOT_DAYS", "0"))
+
+_embed_models = {}
+_embed_models_lock = threading.Lock()
+
+
+def load_embed_model(model_name=EMBED_MODEL_NAME):
+    with _embed_models_lock:
+        if model_name not in _embed_models:
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+            _embed_models[model_name] = HuggingFaceEmbedding(model_name=model_name)
+        Settings.embed_model = _embed_models[model_name]
+        return Settings.embed_model
+
+
+def collection_version(db_path="data/chroma_db", collection_name="documents"):
+    path = os.path.join(db_path, f"{collection_name}.version")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump_collection_version(db_path="data/chroma_db", collection_name="documents"):
+    os.makedirs(db_path, exist_ok=True)
+    version = uuid.uuid4().hex
+    path = os.path.join(db_path, f"{collection_name}.version")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+def numpy_store_dir(db_path, collection_name):
+    return os.path.join(db_path or "data/chroma_db", f"{collection_name}.numpy")
+
+
+def setup_numpy_store(db_path=None, collection_name="documents", reset=False):
+    from numpy_store import NumpyVectorStore
+
+    vector_store = NumpyVectorStore(
+        numpy_store_dir(db_path, collection_name), quantization=NUMPY_QUANTIZATION
+    )
+    if reset:
+        vector_store.clear()
+        print(f"Collection '{collection_name}' was reset")
+
+    load_embed_model()
+
+    print(f"NumPy vector store setup complete at: {vector_store.persist_dir}")
+    print(f"Collection '{collection_name}' contains {vector_store.count()} documents")
+
+    return vector_store, None, vector_store
+
+
+def collection_count(db_path, collection_name="documents", backend=None):
+    if (backend or VECTOR_BACKEND) == "numpy":
+        store_dir = numpy_store_dir(db_path, collection_name)
+        if not os.path.exists(store_dir):
+            return 0
+
+        from numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore(store_dir, quantization=NUMPY_QUANTIZATION).count()
+
+    import chromadb
+
+    try:
+        client = chromadb.PersistentClient(path=db_path)
+        return client.get_collection(collection_name).count()
+    except Exception:
+        return 0
+
+
+def setup_tiered_store(db_path, collection_name="documents", reset=False, **kwargs):
+    vector_store = TieredVectorStore(db_path, collection_name, reset=reset, **kwargs)
+    if reset:
+        vector_store.clear()
+        print(f"Collection '{collection_name}' was reset")
+
+    tiers = vector_store.tiers
+    print(
+        f"Tiered store with {tiers['hot_days']} hot days and "
+        f"{len(tiers['cold'])} cold partitions contains {vector_store.count()} documents"
+    )
+    return vector_store, None, vector_store
+
+
+def setup_chromadb(
+    db_path=None, collection_name="documents", reset=False, backend=None, hot_days=None
+):
     if db_path:
         os.makedirs(db_path, exist_ok=True)
+    configure_chapter_store(db_path)
+    configure_dedup(db_path=db_path)
+
+    hot_days = TIER_HOT_DAYS if hot_days is None else hot_days
+    if db_path and (hot_days > 0 or load_tiers(db_path, collection_name)):
+        return setup_tiered_store(
+            db_path, collection_name, reset, hot_days=hot_days, backend=backend
+        )
+
+    if (backend or VECTOR_BACKEND) == "numpy":
+        return setup_numpy_store(db_path, collection_name, reset)
+
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
 
     try:
         chroma_client = chromadb.PersistentClient(path=db_path)
+        if reset:
+            try:
+                chroma_client.delete_collection(collection_name)
+                print(f"Collection '{collection_name}' was reset")
+            except Exception:
+                pass
         chroma_collection = chroma_client.get_or_create_collection(collection_name)
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
-        Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+        load_embed_model()
 
         print(f"ChromaDB setup complete at: {db_path}")
         print(
@@ -30,13 +163,34 @@ def setup_chromadb(db_path=None, collection_name="documents"):
         raise
 
 
-def get_existing_index(db_path="data/chroma_db", collection_name="documents"):
+def get_existing_index(
+    db_path="data/chroma_db", collection_name="documents", backend=None
+):
     db_path = os.path.abspath(db_path)
 
     if not os.path.exists(db_path):
         print(f"Database directory not found: {db_path}")
         return None
 
+    if (backend or VECTOR_BACKEND) == "numpy":
+        store_dir = numpy_store_dir(db_path, collection_name)
+        if not os.path.exists(store_dir):
+            print(f"Collection '{collection_name}' not found")
+            return None
+
+        from numpy_store import NumpyVectorStore
+
+        vector_store = NumpyVectorStore(store_dir, quantization=NUMPY_QUANTIZATION)
+        if vector_store.count() == 0:
+            print(f"Collection '{collection_name}' is empty")
+            return None
+
+        load_embed_model()
+        return VectorStoreIndex.from_vector_store(vector_store)
+
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
     try:
         chroma_client = chromadb.PersistentClient(path=db_path)
 
@@ -47,7 +201,7 @@ def get_existing_index(db_path="data/chroma_db", collection_name="documents"):
             return None
 
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+        load_embed_model()
         index = VectorStoreIndex.from_vector_store(vector_store)
 
         return index
@@ -60,47 +214,189 @@ def get_existing_index(db_path="data/chroma_db", collection_name="documents"):
         return None
 
 
-def data_load(scraped_results, vector_store):
-    documents = []
+def node_id(index, document):
+    return f"{document.doc_id}-{index}"
+
+
+def caption_chapters(chapters):
+    images = [img for chapter in chapters for img in chapter.get("images", [])]
+    with tracing.span("caption", images=len(images)):
+        captions = get_caption_service().caption_paths([img["path"] for img in images])
+    for img, caption in zip(images, captions):
+        img["caption"] = caption
+    return chapters
+
 
+def drop_duplicates(chapters):
+    index = get_dedup_index()
+    if index is None or not chapters:
+        return chapters
+
+    with tracing.span("dedup", chapters=len(chapters)) as dedup:
+        kept, duplicates = index.filter(chapters)
+        dedup.set(duplicates=len(duplicates))
+    for chapter, canonical_id, similarity in duplicates:
+        print(
+            f"Skipping {chapter['id']}: near-duplicate of {canonical_id} "
+            f"({similarity:.2f})"
+        )
+    return kept
+
+
+def forget_duplicates(chapter_ids):
+    index = get_dedup_index()
+    orphans = index.forget(chapter_ids) if index is not None else []
+    if orphans:
+        print(f"Re-queueing {len(orphans)} chapters that duplicated removed chapters")
+    return orphans
+
+
+def delete_chapters(vector_store, chapter_ids, dedup=True):
+    for doc_id in chapter_ids:
+        vector_store.delete(ref_doc_id=doc_id)
+
+    get_chapter_store().delete(chapter_ids)
+    return forget_duplicates(chapter_ids) if dedup else []
+
+
+def caption_chapter(chapter):
+    return caption_chapters([chapter])[0]
+
+
+def build_document(chapter):
+    text_content = chapter["content"]
+    image_captions = []
+    image_descriptions = []
+
+    for img in chapter.get("images", []):
+        if img.get("caption"):
+            image_captions.append(img["caption"])
+            image_descriptions.append(
+                {
+                    "url": img["url"],
+                    "caption": img["caption"],
+                    "path": img["path"],
+                }
+            )
+
+    full_text = text_content
+    if image_captions:
+        full_text += " " + " ".join(image_captions)
+
+    metadata = {
+        "title": chapter["title"],
+        "url": chapter["url"],
+        "published_date": chapter["published_date"],
+        "published_ts": published_ts(chapter["published_date"]),
+        "article_id": chapter["article_id"],
+        "images": image_descriptions,
+    }
+
+    return Document(id_=chapter["id"], text=full_text, metadata=metadata)
+
+
+def node_parser(layout=None):
+    if (layout or CHUNK_LAYOUT) == "hierarchical":
+        return SentenceSplitter(
+            chunk_size=CHILD_CHUNK_SIZE,
+            chunk_overlap=CHILD_CHUNK_OVERLAP,
+            id_func=node_id,
+        )
+    return SentenceSplitter(id_func=node_id)
+
+
+def store_chapters(documents):
+    get_chapter_store().put_many(chapter_record(document) for document in documents)
+
+
+def migrate_chapter_store(vector_store, chapter_store=None):
+    chapter_store = chapter_store or get_chapter_store()
+    records = {}
+    for node in vector_store.get_nodes():
+        chapter_id = node.ref_doc_id or node.node_id
+        if chapter_id not in records:
+            records[chapter_id] = metadata_record(chapter_id, node.metadata)
+
+    existing = chapter_store.get_images(records)
+    missing = [record for key, record in records.items() if key not in existing]
+    chapter_store.put_many(missing)
+    print(
+        f"Chapter store has {len(existing) + len(missing)} of {len(records)} "
+        f"indexed chapters ({len(missing)} added from node metadata)"
+    )
+    return len(missing)
+
+
+def compact_document(document):
+    metadata = {
+        key: value for key, value in document.metadata.items() if key != "images"
+    }
+    return Document(id_=document.doc_id, text=document.text, metadata=metadata)
+
+
+def embed_documents(documents, batch_size=64, cache_writes=None, layout=None):
+    documents = [compact_document(document) for document in documents]
+    nodes = node_parser(layout).get_nodes_from_documents(documents)
+    embed_model = Settings.embed_model
+    cache = get_model_cache(embed_model)
+
+    with tracing.span("embed", chunks=len(nodes)) as embed:
+        embeddings, computed = cache.embed(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+            embed_model.get_text_embedding_batch,
+            batch_size=batch_size,
+            writes=cache_writes,
+        )
+        embed.set(computed=computed)
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+
+    with tracing.span("embed.sentences") as sentences:
+        sentences.set(computed=embed_sentences(nodes, batch_size, writes=cache_writes))
+
+    if nodes:
+        print(f"Embedded {len(nodes)} chunks ({len(nodes) - computed} from cache)")
+    return nodes
+
+
+def insert_nodes(vector_store, nodes):
+    if nodes:
+        with tracing.span("insert", chunks=len(nodes)):
+            vector_store.add(nodes)
+    return len(nodes)
+
+
+def iter_chapters(scraped_results):
     for result in scraped_results:
         if result["status"] != "success":
             continue
 
-        for chapter in result["chapters"]:
-            text_content = chapter["content"]
-            image_captions = []
-            image_descriptions = []
-
-            for img in chapter.get("images", []):
-                img["caption"] = caption_image(image_path=img["path"])
-
-                if img.get("caption"):
-                    image_captions.append(img["caption"])
-                    image_descriptions.append(
-                        {
-                            "url": img["url"],
-                            "caption": img["caption"],
-                            "path": img["path"],
-                        }
-                    )
-
-            full_text = text_content
-            if image_captions:
-                full_text += " " + " ".join(image_captions)
-
-            metadata = {
-                "title": chapter["title"],
-                "url": chapter["url"],
-                "published_date": chapter["published_date"],
-                "article_id": chapter["article_id"],
-                "images": image_descriptions,
-            }
-
-            doc = Document(text=full_text, metadata=metadata)
-            documents.append(doc)
-
-    index = VectorStoreIndex.from_documents(documents, vector_store=vector_store)
-
-    print(f"Successfully loaded {len(documents)} documents into ChromaDB")
-    return index
+        yield from result["chapters"]
+
+
+def data_load(scraped_results, vector_store, batch_size=32, layout=None):
+    loaded = 0
+    batch = []
+
+    def flush(chapters):
+        with tracing.trace("ingest.batch", chapters=len(chapters)):
+            documents = [
+                build_document(chapter)
+                for chapter in caption_chapters(drop_duplicates(chapters))
+            ]
+            store_chapters(documents)
+            insert_nodes(vector_store, embed_documents(documents, layout=layout))
+        return len(documents)
+
+    for chapter in iter_chapters(scraped_results):
+        batch.append(chapter)
+
+        if len(batch) >= batch_size:
+            loaded += flush(batch)
+            batch = []
+
+    if batch:
+        loaded += flush(batch)
+
+    print(f"Successfully loaded {loaded} documents into ChromaDB")
+    return VectorStoreIndex.from_vector_store(vector_store)